@@ -1,5 +1,5 @@
 """Certificate model - corresponds to Google Sheets 'Certificates' worksheet"""
-import json
+import orjson
 from datetime import datetime
 from app.models.base import db
 
@@ -8,7 +8,7 @@ class Certificate(db.Model):
     __tablename__ = 'certificates'
 
     certificate_id = db.Column(db.String(50), primary_key=True)  # cert-xxxxxxxx
-    user_id = db.Column(db.String(100), nullable=False, index=True)
+    user_id = db.Column(db.String(100), nullable=False)
     user_name = db.Column(db.String(100), default='')
     user_company = db.Column(db.String(200), default='')
     syllabus_id = db.Column(db.String(50), nullable=False, index=True)
@@ -23,11 +23,18 @@ class Certificate(db.Model):
     issued_at = db.Column(db.DateTime, default=datetime.utcnow)
     issued_by = db.Column(db.String(50), default='admin')
 
+    # (user_id, issued_at DESC) serves get_user_certificates() filter + sort;
+    # it also covers plain user_id lookups, so user_id has no separate index
+    # (existing databases: run scripts/add_certificate_user_issued_index.py once)
+    __table_args__ = (
+        db.Index('ix_certificate_user_issued', 'user_id', issued_at.desc()),
+    )
+
     def to_dict(self):
         """Output format matches certificate_service._row_to_certificate()"""
         try:
-            cs = json.loads(self.course_scores) if self.course_scores else {}
-        except (json.JSONDecodeError, TypeError):
+            cs = orjson.loads(self.course_scores) if self.course_scores else {}
+        except (orjson.JSONDecodeError, TypeError):
             cs = {}
 
         return {
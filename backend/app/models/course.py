@@ -1,5 +1,5 @@
 """Course model - corresponds to courses.json"""
-import json
+import orjson
 from datetime import datetime
 from app.models.base import db
 
@@ -29,8 +29,8 @@ class Course(db.Model):
         if not value:
             return default
         try:
-            return json.loads(value)
-        except (json.JSONDecodeError, TypeError):
+            return orjson.loads(value)
+        except (orjson.JSONDecodeError, TypeError):
             return default
 
     def to_dict(self):
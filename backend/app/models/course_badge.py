@@ -7,7 +7,7 @@ class CourseBadge(db.Model):
     __tablename__ = 'course_badges'
 
     badge_id = db.Column(db.String(50), primary_key=True)  # badge-xxxxxxxx
-    user_id = db.Column(db.String(100), nullable=False, index=True)
+    user_id = db.Column(db.String(100), nullable=False)
     user_name = db.Column(db.String(100), default='')
     course_id = db.Column(db.String(50), nullable=False)
     course_title = db.Column(db.String(200), default='')
@@ -19,9 +19,15 @@ class CourseBadge(db.Model):
     first_passed_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    # Composite index for user+course lookups
+    # One badge per user+course; the unique index also serves user+course lookups
+    # and is the conflict target of the badge UPSERT (existing databases: run
+    # scripts/add_badge_unique_constraint.py once to dedupe and add it).
+    # (user_id, first_passed_at DESC) serves get_user_badges() without a sort step.
+    # Both lead with user_id, so no separate single-column user_id index is needed
+    # (existing databases: run scripts/add_badge_user_first_passed_index.py once).
     __table_args__ = (
-        db.Index('idx_badge_user_course', 'user_id', 'course_id'),
+        db.UniqueConstraint('user_id', 'course_id', name='uq_badge_user_course'),
+        db.Index('ix_badge_user_first_passed', 'user_id', first_passed_at.desc()),
     )
 
     def to_dict(self):
@@ -6,6 +6,7 @@ from app.services.progress_service import progress_service
 from app.utils import api_key_required
 from app.models.base import db
 from io import BytesIO
+import orjson
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
@@ -150,8 +151,6 @@ def get_courses():
 def create_course():
     """创建新课程 (上传 PDF)"""
     try:
-        import json as json_module
-
         # 获取上传的文件
         if 'pdf' not in request.files:
             return jsonify({'success': False, 'message': '请上传 PDF 文件'}), 400
@@ -169,19 +168,16 @@ def create_course():
 
         # 解析标签 (JSON 格式的字符串数组)
         tags_str = request.form.get('tags', '').strip()
-        tags = json_module.loads(tags_str) if tags_str else []
+        tags = orjson.loads(tags_str) if tags_str else []
 
         if not title:
             return jsonify({'success': False, 'message': '课程标题不能为空'}), 400
 
-        # 读取 PDF 内容
-        pdf_content = pdf_file.read()
-
-        # 创建课程
-        course = course_service.create_course(
+        # 创建课程（PDF 直接从上传流分块写盘）
+        course = course_service.create_course_from_stream(
             title=title,
             description=description,
-            pdf_content=pdf_content,
+            pdf_stream=pdf_file.stream,
             quiz_survey_id=quiz_survey_id,
             pass_score=pass_score,
             tags=tags,
@@ -522,7 +518,6 @@ def create_badges_from_progress():
     try:
         from app.services.badge_service import get_badge_service
         from app.services.sheets_service import sheets_service
-        import json
 
         badge_svc = get_badge_service()
 
@@ -533,6 +528,7 @@ def create_badges_from_progress():
         created_badges = []
         skipped_badges = []
         failed_badges = []
+        pending_badges = []
 
         for user_progress in all_progress:
             user_id = user_progress.get('user_id')
@@ -543,7 +539,7 @@ def create_badges_from_progress():
             first_passed = user_progress.get('firstPassedQuizzes', [])
             if isinstance(first_passed, str):
                 try:
-                    first_passed = json.loads(first_passed)
+                    first_passed = orjson.loads(first_passed)
                 except:
                     first_passed = []
 
@@ -589,31 +585,16 @@ def create_badges_from_progress():
                         max_score = 50
                         percentage = 100
 
-                    # 创建徽章
-                    result = badge_svc.issue_or_update_badge(
-                        user_id=user_id,
-                        course_id=course_info['course_id'],
-                        course_title=course_info['course_title'],
-                        survey_id=survey_id,
-                        score=score,
-                        max_score=max_score,
-                        percentage=percentage
-                    )
-
-                    if result.get('success'):
-                        created_badges.append({
-                            'user_id': user_id,
-                            'course_id': course_info['course_id'],
-                            'course_title': course_info['course_title'],
-                            'score': score,
-                            'max_score': max_score
-                        })
-                    else:
-                        failed_badges.append({
-                            'user_id': user_id,
-                            'survey_id': survey_id,
-                            'reason': result.get('message', '创建失败')
-                        })
+                    # 收集待创建的徽章，循环结束后一次性批量写入
+                    pending_badges.append({
+                        'user_id': user_id,
+                        'course_id': course_info['course_id'],
+                        'course_title': course_info['course_title'],
+                        'survey_id': survey_id,
+                        'score': score,
+                        'max_score': max_score,
+                        'percentage': percentage
+                    })
 
                 except Exception as e:
                     failed_badges.append({
@@ -622,6 +603,35 @@ def create_badges_from_progress():
                         'reason': str(e)
                     })
 
+        # 批量创建徽章（单条 INSERT，冲突即已存在的徽章跳过）
+        try:
+            issued = badge_svc.issue_badges_batch(pending_badges)
+            issued_keys = {(b['user_id'], b['course_id']) for b in issued}
+            for badge in pending_badges:
+                if (badge['user_id'], badge['course_id']) in issued_keys:
+                    issued_keys.discard((badge['user_id'], badge['course_id']))
+                    created_badges.append({
+                        'user_id': badge['user_id'],
+                        'course_id': badge['course_id'],
+                        'course_title': badge['course_title'],
+                        'score': badge['score'],
+                        'max_score': badge['max_score']
+                    })
+                else:
+                    skipped_badges.append({
+                        'user_id': badge['user_id'],
+                        'survey_id': badge['survey_id'],
+                        'course_id': badge['course_id'],
+                        'reason': '徽章已存在'
+                    })
+        except Exception as e:
+            for badge in pending_badges:
+                failed_badges.append({
+                    'user_id': badge['user_id'],
+                    'survey_id': badge['survey_id'],
+                    'reason': str(e)
+                })
+
         return jsonify({
             'success': True,
             'created_count': len(created_badges),
@@ -641,6 +651,35 @@ def create_badges_from_progress():
         }), 500
 
 
+@admin_bp.route('/migrate/refresh-badge-user-names', methods=['POST'])
+@api_key_required
+def refresh_badge_user_names():
+    """
+    刷新徽章中冗余存储的用户名（徽章更新时不再重新查询用户名）
+
+    Body (可选):
+        {"user_ids": ["emp_123", ...]}  不传则刷新全部
+    """
+    try:
+        from app.services.badge_service import get_badge_service
+
+        data = request.get_json(silent=True) or {}
+        updated = get_badge_service().refresh_user_names(data.get('user_ids'))
+
+        return jsonify({
+            'success': True,
+            'updated_count': updated
+        }), 200
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+
 # ==================== 学习成绩分析 ====================
 
 @admin_bp.route('/learning-analytics', methods=['GET'])
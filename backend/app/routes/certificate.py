@@ -2,11 +2,15 @@
 证书路由
 提供证书的颁发、查询功能
 """
+import logging
+
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.certificate_service import certificate_service
 from app.utils import api_key_required
 
+logger = logging.getLogger(__name__)
+
 certificate_bp = Blueprint('certificate', __name__, url_prefix='/api')
 
 
@@ -16,11 +20,15 @@ certificate_bp = Blueprint('certificate', __name__, url_prefix='/api')
 @jwt_required()
 def get_user_certificates():
     """
-    获取当前用户的所有证书
+    获取当前用户的证书（按颁发时间倒序）
 
     Headers:
         Authorization: Bearer <token>
 
+    Query:
+        limit: 最多返回条数（可选，默认全部，不能为负数）
+        offset: 跳过的条数（可选，默认 0，不能为负数）
+
     Response:
         成功: {
             "success": true,
@@ -48,7 +56,12 @@ def get_user_certificates():
         if not user_id:
             return jsonify({'success': False, 'message': '用户未登录'}), 401
 
-        certificates = certificate_service.get_user_certificates(user_id)
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', 0, type=int)
+        if (limit is not None and limit < 0) or offset < 0:
+            return jsonify({'success': False, 'message': '分页参数不能为负数'}), 400
+
+        certificates = certificate_service.get_user_certificates(user_id, limit, offset)
 
         return jsonify({
             'success': True,
@@ -56,7 +69,7 @@ def get_user_certificates():
         }), 200
 
     except Exception as e:
-        print(f"❌ 获取用户证书失败: {str(e)}")
+        logger.exception("❌ 获取用户证书失败: %s", e)
         return jsonify({
             'success': False,
             'message': f'获取证书失败: {str(e)}'
@@ -95,7 +108,7 @@ def get_certificate_detail(certificate_id):
         }), 200
 
     except Exception as e:
-        print(f"❌ 获取证书详情失败: {str(e)}")
+        logger.exception("❌ 获取证书详情失败: %s", e)
         return jsonify({
             'success': False,
             'message': f'获取证书详情失败: {str(e)}'
@@ -145,7 +158,7 @@ def issue_certificates(syllabus_id):
             return jsonify(result), 400
 
     except Exception as e:
-        print(f"❌ 颁发证书失败: {str(e)}")
+        logger.exception("❌ 颁发证书失败: %s", e)
         import traceback
         traceback.print_exc()
         return jsonify({
@@ -166,6 +179,9 @@ def get_syllabus_certificates(syllabus_id):
     Headers:
         X-API-Key: <admin_api_key>
 
+    Query:
+        include_list: 为 false 时只返回证书数量（可选，默认 true）
+
     Response:
         成功: {
             "success": true,
@@ -176,7 +192,8 @@ def get_syllabus_certificates(syllabus_id):
         }
     """
     try:
-        stats = certificate_service.get_syllabus_certificate_stats(syllabus_id)
+        include_list = request.args.get('include_list', 'true').lower() != 'false'
+        stats = certificate_service.get_syllabus_certificate_stats(syllabus_id, include_list)
 
         return jsonify({
             'success': True,
@@ -184,7 +201,7 @@ def get_syllabus_certificates(syllabus_id):
         }), 200
 
     except Exception as e:
-        print(f"❌ 获取证书统计失败: {str(e)}")
+        logger.exception("❌ 获取证书统计失败: %s", e)
         return jsonify({
             'success': False,
             'message': f'获取证书统计失败: {str(e)}'
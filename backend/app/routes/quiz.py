@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
 from app.services import quiz_service, survey_service
 from app.services.sheets_service import sheets_service
 # badge_service 使用延迟导入，避免初始化失败导致整个模块无法加载
@@ -18,14 +20,13 @@ def submit_quiz():
         if not survey_id:
             return jsonify({'success': False, 'message': '缺少问卷ID'}), 400
 
-        # 尝试获取用户ID（如果有JWT token）
+        # 尝试获取用户ID（如果有JWT token）；token 无效或过期时按匿名用户判分
         user_id = None
         try:
             verify_jwt_in_request(optional=True)
             user_id = get_jwt_identity()
-            print(f"🔐 JWT user_id: {user_id}")
-        except Exception as e:
-            print(f"🔐 JWT 获取失败: {str(e)}")
+        except (JWTExtendedException, PyJWTError):
+            pass
 
         # 计算得分
         result = quiz_service.grade_quiz(user_name, survey_id, answers)
@@ -117,7 +118,7 @@ def start_quiz(survey_id):
         if not valid: return jsonify({'success': False, 'message': msg}), 403
         can_attempt, remaining = quiz_service.check_attempt_limit(user_id, survey_id)
         if not can_attempt: return jsonify({'success': False, 'message': '已达到最大尝试次数'}), 403
-        return jsonify({'success': True, 'data': {'attempt_number': int(survey_service.get_survey_by_id(survey_id).get('max_attempts', 3)) - remaining + 1, 'remaining': remaining}}), 200
+        return jsonify({'success': True, 'data': {'attempt_number': survey_service.get_survey_by_id(survey_id)['max_attempts'] - remaining + 1, 'remaining': remaining}}), 200
     except Exception as e: return jsonify({'success': False, 'message': str(e)}), 500
 
 @quiz_bp.route('/wrong/<survey_id>', methods=['GET'])
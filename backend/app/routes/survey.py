@@ -71,15 +71,33 @@ def convert_letters_to_options(letters, options):
     """将字母列表转换为选项文本列表"""
     if not options:
         return letters
-    result = []
-    for letter in letters:
+    # 循环不变量只计算一次：可映射的字母范围为 A..min(选项数, 26)
+    base = ord('A')
+    limit = min(len(options), 26)
+
+    def xlate(letter):
         letter_str = str(letter).strip()
-        if len(letter_str) == 1 and letter_str.upper() in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ':
-            opt = letter_to_option(letter_str, options)
-            result.append(opt)
-        else:
-            result.append(letter_str)
-    return result
+        upper = letter_str.upper()
+        if len(upper) == 1:
+            index = ord(upper) - base
+            if 0 <= index < limit:
+                return options[index]
+        return letter_str
+
+    return [xlate(letter) for letter in letters]
+
+# 返回给前端的题目字段（顺序即输出顺序）
+SAFE_QUESTION_KEYS = ('id', 'question_id', 'question_type', 'question_text', 'options', 'score', 'correct_answer')
+
+
+def _shape_question(q):
+    """按 SAFE_QUESTION_KEYS 组装单个题目（固定每题5分）"""
+    question_id = q['question_id']
+    options = q.get('options', [])
+    return dict(zip(SAFE_QUESTION_KEYS, (
+        question_id, question_id, q['question_type'], q['question_text'],
+        options, 5, parse_correct_answer(q.get('correct_answer'), options)
+    )))
 
 @survey_bp.route('', methods=['GET'])
 @jwt_required()
@@ -90,7 +108,7 @@ def get_surveys():
         result = []
         for s in surveys:
             attempts = sheets_service.get_user_attempts(user_id, s.get('survey_id'))
-            max_attempts = int(s.get('max_attempts', 3))
+            max_attempts = s['max_attempts']
             result.append({**s, 'user_attempts': attempts, 'remaining_attempts': max_attempts - attempts})
         return jsonify({'success': True, 'data': result}), 200
     except Exception as e: return jsonify({'success': False, 'message': str(e)}), 500
@@ -118,15 +136,7 @@ def get_questions(survey_id):
             questions = survey_service.get_shuffled_questions(survey_id)
 
         # 固定每题5分
-        safe_questions = [{
-            'id': q['question_id'],
-            'question_id': q['question_id'],
-            'question_type': q['question_type'],
-            'question_text': q['question_text'],
-            'options': q.get('options', []),
-            'score': 5,
-            'correct_answer': parse_correct_answer(q.get('correct_answer'), q.get('options', []))
-        } for q in questions]
+        safe_questions = [_shape_question(q) for q in questions]
 
         return jsonify({'success': True, 'data': safe_questions}), 200
     except Exception as e: return jsonify({'success': False, 'message': str(e)}), 500
@@ -148,6 +158,6 @@ def get_attempts(survey_id):
         survey = survey_service.get_survey_by_id(survey_id)
         if not survey: return jsonify({'success': False, 'message': '问卷不存在'}), 404
         attempts = sheets_service.get_user_attempts(user_id, survey_id)
-        max_attempts = int(survey.get('max_attempts', 3))
+        max_attempts = survey['max_attempts']
         return jsonify({'success': True, 'data': {'current': attempts, 'max': max_attempts, 'remaining': max_attempts - attempts}}), 200
     except Exception as e: return jsonify({'success': False, 'message': str(e)}), 500
@@ -1,5 +1,5 @@
 """课程表路由"""
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.services.syllabus_service import syllabus_service
 from app.services.course_service import course_service
@@ -36,12 +36,23 @@ def _parse_jwt_identity(identity) -> dict:
     return {'user_id': '', 'user_type': 'guest', 'accessible_syllabi': []}
 
 
+def _current_user_info() -> dict:
+    """获取当前请求的 user_info（同一请求内只解析一次，缓存在 flask.g）
+
+    需在 @jwt_required() 校验之后调用
+    """
+    user_info = g.get('user_info')
+    if user_info is None:
+        user_info = g.user_info = _parse_jwt_identity(get_jwt_identity())
+    return user_info
+
+
 @syllabus_bp.route('/syllabi', methods=['GET'])
 @jwt_required()
 def get_accessible_syllabi():
     """获取用户可访问的课程表列表"""
     try:
-        user_info = _parse_jwt_identity(get_jwt_identity())
+        user_info = _current_user_info()
         syllabi = syllabus_service.get_accessible_syllabi(user_info)
         return jsonify({'success': True, 'data': syllabi})
     except Exception as e:
@@ -53,7 +64,7 @@ def get_accessible_syllabi():
 def get_syllabus_detail(syllabus_id):
     """获取课程表详情"""
     try:
-        user_info = _parse_jwt_identity(get_jwt_identity())
+        user_info = _current_user_info()
 
         syllabus = syllabus_service.get_syllabus(syllabus_id)
         if not syllabus:
@@ -73,7 +84,7 @@ def get_syllabus_detail(syllabus_id):
 def get_syllabus_courses(syllabus_id):
     """获取课程表中的课程列表（含进度）"""
     try:
-        user_info = _parse_jwt_identity(get_jwt_identity())
+        user_info = _current_user_info()
 
         syllabus = syllabus_service.get_syllabus(syllabus_id)
         if not syllabus:
@@ -87,13 +98,17 @@ def get_syllabus_courses(syllabus_id):
         course_sequence = syllabus.get('course_sequence', [])
         courses_with_details = []
 
+        # 课程表中的所有课程一次查询取回
+        courses = course_service.get_courses_by_ids(item.get('course_id') for item in course_sequence)
+
         for item in sorted(course_sequence, key=lambda x: x.get('order', 999)):
-            course = course_service.get_course(item.get('course_id'))
+            course = courses.get(item.get('course_id'))
             if course:
+                # 同一课程可能在课程表中重复出现，每项复制一份再补充字段
                 courses_with_details.append({
                     **course,
                     'order_in_syllabus': item.get('order'),
-                    'is_optional': item.get('is_optional', False)
+                    'is_optional': item.get('is_optional', False),
                 })
 
         return jsonify({'success': True, 'data': courses_with_details})
@@ -1,10 +1,12 @@
 """用户组路由"""
 import os
-import json
+import orjson
 from flask import Blueprint, request, jsonify
 from app.services.user_group_service import user_group_service
 from app.services.sheets_service import sheets_service
-from app.services.pma_api_service import get_all_employees, get_raw_employees
+from app.services.pma_api_service import (
+    get_all_employees, get_raw_employees, search_cached_employees, clear_employee_cache
+)
 from app.utils import api_key_required
 
 user_group_bp = Blueprint('user_group', __name__, url_prefix='/api/admin')
@@ -32,8 +34,8 @@ def migrate_user_groups_to_sheets():
         if not os.path.exists(json_path):
             return jsonify({'success': False, 'message': 'user_groups.json 不存在'}), 404
 
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(json_path, 'rb') as f:
+            data = orjson.loads(f.read())
 
         groups = data.get('user_groups', [])
         if not groups:
@@ -43,21 +45,23 @@ def migrate_user_groups_to_sheets():
         raw_employees = get_raw_employees()
         id_mapping = {}  # emp_{user_id} → emp_{id}
         for emp in raw_employees:
-            raw_user_id = emp.get('user_id')  # 外部 API 的 user_id 字段
-            raw_id = emp.get('id')            # 外部 API 的 id 字段
-            source = emp.get('source', 'sp8d')
-
-            if raw_user_id is not None and raw_id is not None and str(raw_user_id) != str(raw_id):
-                if source == 'ovs':
-                    old_key = f"emp_ovs_{raw_user_id}"
-                    new_key = f"emp_ovs_{raw_id}"
-                else:
-                    old_key = f"emp_{raw_user_id}"
-                    new_key = f"emp_{raw_id}"
-                id_mapping[old_key] = new_key
-
-        # 3. 迁移每个组到 Sheets
-        sheet = sheets_service.user_groups_sheet
+            get = emp.get
+            raw_user_id = get('user_id')  # 外部 API 的 user_id 字段
+            raw_id = get('id')            # 外部 API 的 id 字段
+            if raw_user_id is None or raw_id is None:
+                continue
+
+            str_user_id = str(raw_user_id)
+            str_id = str(raw_id)
+            if str_user_id == str_id:
+                continue
+
+            prefix = 'emp_ovs_' if get('source', 'sp8d') == 'ovs' else 'emp_'
+            id_mapping[prefix + str_user_id] = prefix + str_id
+
+        # 3. 修正每个组的 member_ids，收集待写入的行
+        rows_to_append = []
+        dumps = orjson.dumps  # 循环外绑定，orjson 直接输出 UTF-8，无需 ensure_ascii
         migrated = []
         id_fixes = []
 
@@ -70,16 +74,14 @@ def migrate_user_groups_to_sheets():
             updated_at = group.get('updated_at', '')
 
             # 修正 member_ids
-            new_member_ids = []
-            for mid in old_member_ids:
-                if mid in id_mapping:
-                    id_fixes.append({'old': mid, 'new': id_mapping[mid], 'group': name})
-                    new_member_ids.append(id_mapping[mid])
-                else:
-                    new_member_ids.append(mid)
+            new_member_ids = [id_mapping.get(mid, mid) for mid in old_member_ids]
+            id_fixes.extend(
+                {'old': old, 'new': new, 'group': name}
+                for old, new in zip(old_member_ids, new_member_ids) if old != new
+            )
 
-            member_ids_json = json.dumps(new_member_ids, ensure_ascii=False)
-            sheet.append_row([group_id, name, description, member_ids_json, created_at, updated_at])
+            member_ids_json = dumps(new_member_ids).decode('utf-8')
+            rows_to_append.append([group_id, name, description, member_ids_json, created_at, updated_at])
 
             migrated.append({
                 'group_id': group_id,
@@ -88,8 +90,10 @@ def migrate_user_groups_to_sheets():
                 'member_ids': new_member_ids,
             })
 
-        # 清除缓存
+        # 4. 一次性批量写入，再清除缓存
+        user_group_service.save_user_groups_batch(rows_to_append)
         sheets_service.clear_cache('user_groups')
+        clear_employee_cache()
 
         return jsonify({
             'success': True,
@@ -235,11 +239,14 @@ def search_users():
         query = request.args.get('q', '').strip()
         limit = int(request.args.get('limit', 20))
 
-        if not query:
+        # 单字符查询几乎匹配所有人，直接返回空结果，不请求后端
+        if len(query) < 2:
             return jsonify({'success': True, 'data': []})
 
-        # 优先从 PMA 系统搜索
-        users = get_all_employees(limit=limit, search=query)
+        # 优先从 PMA 系统搜索：完整的员工列表已缓存且本地有匹配时直接返回，否则请求外部 API
+        users = search_cached_employees(query, limit)
+        if users is None:
+            users = get_all_employees(limit=limit, search=query)
         if users:
             return jsonify({'success': True, 'data': users, 'source': 'pma'})
 
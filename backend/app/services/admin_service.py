@@ -1,7 +1,10 @@
 from app.services.sheets_service import sheets_service
 from app.utils import validate_datetime, validate_question_type
 from openpyxl import load_workbook
-from io import BytesIO
+
+# Valid answer letters and fullwidth-comma normalisation for Excel imports
+_VALID_ANSWERS = frozenset('ABCDEF')
+_COMMA_TR = str.maketrans({'，': ','})
 
 class AdminService:
     @staticmethod
@@ -61,13 +64,15 @@ class AdminService:
     @staticmethod
     def parse_excel_file(file):
         """Parse an Excel file and extract questions"""
+        wb = None
         try:
-            # Read the file into memory
-            file_content = BytesIO(file.read())
-            wb = load_workbook(file_content, read_only=True)
+            # Stream directly from the upload (read-only mode parses lazily, no BytesIO copy)
+            wb = load_workbook(getattr(file, 'stream', file), read_only=True,
+                               data_only=True, keep_links=False)
             ws = wb.active
 
             questions = []
+            strip = str.strip
             # Skip header row, start from row 2
             for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
                 # Skip empty rows
@@ -81,8 +86,8 @@ class AdminService:
                 # G: correct_answer
                 # H: score
                 # I: explanation
-                question_type = str(row[0]).strip().lower() if row[0] else 'single'
-                question_text = str(row[1]).strip() if len(row) > 1 and row[1] else ''
+                question_type = strip(str(row[0])).lower() if row[0] else 'single'
+                question_text = strip(str(row[1])) if len(row) > 1 and row[1] else ''
 
                 if not question_text:
                     continue
@@ -91,24 +96,24 @@ class AdminService:
                 options = []
                 for i in range(2, 6):  # Columns C, D, E, F
                     if len(row) > i and row[i]:
-                        options.append(str(row[i]).strip())
+                        options.append(strip(str(row[i])))
 
                 if len(options) < 2:
                     raise ValueError(f'第{row_idx}行: 至少需要2个选项')
 
                 # Parse correct answer
-                correct_answer = str(row[6]).strip().upper() if len(row) > 6 and row[6] else 'A'
+                correct_answer = strip(str(row[6])).upper() if len(row) > 6 and row[6] else 'A'
 
                 # Validate correct answer
                 if question_type == 'single':
-                    if correct_answer not in ['A', 'B', 'C', 'D', 'E', 'F']:
+                    if correct_answer not in _VALID_ANSWERS:
                         raise ValueError(f'第{row_idx}行: 单选题答案必须是 A-F')
                 else:
-                    # Multiple choice: validate each answer
-                    answers = [a.strip() for a in correct_answer.replace('，', ',').split(',')]
-                    for a in answers:
-                        if a not in ['A', 'B', 'C', 'D', 'E', 'F']:
-                            raise ValueError(f'第{row_idx}行: 多选题答案必须是 A-F，用逗号分隔')
+                    # Multiple choice: split and normalise the answers
+                    answers = [strip(a) for a in correct_answer.translate(_COMMA_TR).split(',')]
+                    # Validate the whole answer list in one C-level subset check
+                    if not _VALID_ANSWERS.issuperset(answers):
+                        raise ValueError(f'第{row_idx}行: 多选题答案必须是 A-F，用逗号分隔')
                     correct_answer = ','.join(answers)
 
                 # Parse score
@@ -120,7 +125,7 @@ class AdminService:
                         score = 5
 
                 # Parse explanation
-                explanation = str(row[8]).strip() if len(row) > 8 and row[8] else ''
+                explanation = strip(str(row[8])) if len(row) > 8 and row[8] else ''
 
                 questions.append({
                     'question_type': question_type,
@@ -139,6 +144,10 @@ class AdminService:
             raise
         except Exception as e:
             raise ValueError(f'解析Excel失败: {str(e)}')
+        finally:
+            # Release the underlying ZIP handle held by the read-only workbook
+            if wb is not None:
+                wb.close()
 
 
 admin_service = AdminService()
@@ -2,11 +2,15 @@
 认证服务
 支持客人登录和员工登录两种模式
 """
+import logging
+
 from app.services.sheets_service import sheets_service
 from app.services.pma_api_service import verify_employee
 from app.services.progress_service import progress_service
 from app.utils import generate_token, validate_phone, validate_name, validate_company
 
+logger = logging.getLogger(__name__)
+
 
 class AuthService:
     """认证服务类"""
@@ -49,30 +53,19 @@ class AuthService:
         if not validate_phone(phone):
             raise ValueError('手机号格式不正确')
 
-        # 查找或创建用户
-        existing = sheets_service.find_user_by_phone(phone)
-        if existing:
-            user_id = existing.get('user_id')
-        else:
-            new_user = sheets_service.create_user(name, company, phone)
-            user_id = new_user.get('user_id')
-
-        # 获取用户信息
-        user = sheets_service.get_user_by_id(user_id)
+        # 查找或创建用户（两者都已返回完整用户信息，无需再按 ID 查询）
+        user = sheets_service.find_user_by_phone(phone) or sheets_service.create_user(name, company, phone)
+        user_id = user.get('user_id')
 
         # 生成 Token，包含 accessible_syllabi 信息
         token = generate_token(user_id, user_type='guest', accessible_syllabi=accessible_syllabi or [])
 
         # 获取用户进度
-        print(f"========== GUEST LOGIN DEBUG (backend) ==========")
-        print(f"[GuestLogin] Getting progress for user_id: {user_id}")
         progress = progress_service.get_user_progress(user_id)
-        print(f"[GuestLogin] Progress from DB: {progress}")
+        logger.debug("[GuestLogin] Progress from DB for %s: %s", user_id, progress)
         if progress is None:
-            print(f"[GuestLogin] No progress found, using default")
+            logger.debug("[GuestLogin] No progress found for %s, using default", user_id)
             progress = progress_service.get_default_progress()
-        print(f"[GuestLogin] Returning progress: hearts={progress.get('hearts')}, totalXP={progress.get('totalXP')}, streak={progress.get('streak')}")
-        print(f"========== GUEST LOGIN DEBUG END ==========")
 
         return {
             'user_id': user_id,
@@ -140,15 +133,11 @@ class AuthService:
         token = generate_token(user_id, user_type='employee')
 
         # 获取用户进度
-        print(f"========== LOGIN DEBUG (backend) ==========")
-        print(f"[Login] Getting progress for user_id: {user_id}")
         progress = progress_service.get_user_progress(user_id)
-        print(f"[Login] Progress from DB: {progress}")
+        logger.debug("[Login] Progress from DB for %s: %s", user_id, progress)
         if progress is None:
-            print(f"[Login] No progress found, using default")
+            logger.debug("[Login] No progress found for %s, using default", user_id)
             progress = progress_service.get_default_progress()
-        print(f"[Login] Returning progress: hearts={progress.get('hearts')}, totalXP={progress.get('totalXP')}, streak={progress.get('streak')}")
-        print(f"========== LOGIN DEBUG END ==========")
 
         return {
             'success': True,
@@ -3,40 +3,118 @@
 管理课程徽章的发放、更新和查询
 """
 from datetime import datetime
+import logging
+import time
 import uuid
 import threading
 
+from sqlalchemy import bindparam, func, lambda_stmt, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
 from app.models.base import db
 from app.models.course_badge import CourseBadge
 
+logger = logging.getLogger(__name__)
 
-class BadgeService:
-    """徽章管理服务 - 管理课程徽章"""
+# 用户名缓存：user_id → (expires_at, name)，避免每次发放徽章都查询 PMA/数据库
+USER_NAME_CACHE_TTL = 600
+USER_NAME_CACHE_MAXSIZE = 4096
+UNKNOWN_USER_NAME = '未知用户'
 
-    _instance = None
-    _lock = threading.Lock()
+def _round_percentage(percentage) -> int:
+    """百分比在入口处取整一次（四舍五入，不再用 int() 截断；已是 int 时原样返回）"""
+    return percentage if isinstance(percentage, int) else round(percentage)
 
-    def __new__(cls):
-        if cls._instance is None:
-            with cls._lock:
-                if cls._instance is None:
-                    cls._instance = super(BadgeService, cls).__new__(cls)
-                    cls._instance._initialized = False
-        return cls._instance
 
-    def __init__(self):
-        if self._initialized:
-            return
+# 按用户+课程查询徽章：语句只构建一次，执行时复用缓存的编译结果
+_BADGE_BY_USER_COURSE = lambda_stmt(
+    lambda: select(CourseBadge).where(
+        CourseBadge.user_id == bindparam('uid'),
+        CourseBadge.course_id == bindparam('cid')
+    )
+)
+
+
+class BadgeService:
+    """徽章管理服务 - 管理课程徽章"""
 
+    def __init__(self):
         try:
-            self._initialized = True
-            print("✅ BadgeService 初始化成功")
+            self._user_name_cache = {}
+            self._user_name_cache_lock = threading.Lock()
+            logger.info("✅ BadgeService 初始化成功")
         except Exception as e:
-            print(f"❌ BadgeService 初始化失败: {str(e)}")
+            logger.error("❌ BadgeService 初始化失败: %s", e)
             raise
 
     def _get_user_name(self, user_id: str) -> str:
-        """获取用户名"""
+        """获取用户名（带 TTL 缓存，查询失败的结果不缓存）"""
+        now = time.monotonic()
+        with self._user_name_cache_lock:
+            entry = self._user_name_cache.get(user_id)
+        if entry and entry[0] > now:
+            return entry[1]
+
+        name = self._fetch_user_name(user_id)
+        if name != UNKNOWN_USER_NAME:
+            with self._user_name_cache_lock:
+                if len(self._user_name_cache) >= USER_NAME_CACHE_MAXSIZE:
+                    # 淘汰最早写入的一项
+                    del self._user_name_cache[next(iter(self._user_name_cache))]
+                self._user_name_cache[user_id] = (now + USER_NAME_CACHE_TTL, name)
+        return name
+
+    def _get_user_names(self, user_ids) -> dict:
+        """批量获取用户名：员工一次遍历员工列表，客人一次 IN 查询（结果写入 TTL 缓存）"""
+        now = time.monotonic()
+        names = {}
+        missing = []
+        with self._user_name_cache_lock:
+            for user_id in user_ids:
+                entry = self._user_name_cache.get(user_id)
+                if entry and entry[0] > now:
+                    names[user_id] = entry[1]
+                else:
+                    missing.append(user_id)
+
+        if missing:
+            employee_ids = [uid for uid in missing if uid.startswith('emp_')]
+            guest_ids = [uid for uid in missing if not uid.startswith('emp_')]
+            found = {}
+            try:
+                if employee_ids:
+                    from app.services.pma_api_service import get_employees_by_ids
+                    for uid, emp in get_employees_by_ids(employee_ids).items():
+                        found[uid] = emp.get('name', UNKNOWN_USER_NAME)
+                if guest_ids:
+                    from app.services.sheets_service import sheets_service
+                    for uid, user in sheets_service.get_users_by_ids(guest_ids).items():
+                        found[uid] = user.get('name', UNKNOWN_USER_NAME)
+            except Exception:
+                pass
+
+            with self._user_name_cache_lock:
+                for user_id in missing:
+                    name = found.get(user_id, UNKNOWN_USER_NAME)
+                    names[user_id] = name
+                    if name == UNKNOWN_USER_NAME:
+                        continue
+                    if len(self._user_name_cache) >= USER_NAME_CACHE_MAXSIZE:
+                        del self._user_name_cache[next(iter(self._user_name_cache))]
+                    self._user_name_cache[user_id] = (now + USER_NAME_CACHE_TTL, name)
+
+        return names
+
+    def invalidate_user_name(self, user_id: str = None):
+        """清除用户名缓存；不传 user_id 时清空全部"""
+        with self._user_name_cache_lock:
+            if user_id is None:
+                self._user_name_cache.clear()
+            else:
+                self._user_name_cache.pop(user_id, None)
+
+    def _fetch_user_name(self, user_id: str) -> str:
+        """从 PMA/数据库查询用户名"""
         try:
             if user_id.startswith('emp_'):
                 # 员工用户
@@ -44,31 +122,34 @@ class BadgeService:
                 emp_id = user_id[4:]  # 去掉 emp_ 前缀
                 emp = get_employee_by_id(emp_id)
                 if emp:
-                    return emp.get('name', '未知用户')
+                    return emp.get('name', UNKNOWN_USER_NAME)
             else:
                 # 客人用户
                 from app.services.sheets_service import sheets_service
                 user = sheets_service.get_user_by_id(user_id)
                 if user:
-                    return user.get('name', '未知用户')
+                    return user.get('name', UNKNOWN_USER_NAME)
         except Exception:
             pass
-        return '未知用户'
+        return UNKNOWN_USER_NAME
+
+    def _load_badge(self, user_id: str, course_id: str) -> CourseBadge | None:
+        """根据用户ID和课程ID获取徽章 ORM 对象"""
+        return db.session.execute(
+            _BADGE_BY_USER_COURSE, {'uid': user_id, 'cid': course_id}
+        ).scalar_one_or_none()
 
     def _get_badge_by_user_course(self, user_id: str, course_id: str) -> dict | None:
         """根据用户ID和课程ID获取徽章"""
         try:
-            badge = CourseBadge.query.filter_by(
-                user_id=user_id,
-                course_id=course_id
-            ).first()
+            badge = self._load_badge(user_id, course_id)
 
             if badge:
                 return badge.to_dict()
             return None
 
         except Exception as e:
-            print(f"❌ 获取徽章失败: {str(e)}")
+            logger.error("❌ 获取徽章失败: %s", e)
             return None
 
     def issue_or_update_badge(
@@ -91,7 +172,7 @@ class BadgeService:
             survey_id: 测验ID
             score: 得分
             max_score: 满分
-            percentage: 百分比
+            percentage: 百分比（非整数时四舍五入）
 
         Returns:
             {
@@ -103,90 +184,182 @@ class BadgeService:
         """
         try:
             now = datetime.now()
+            pct = _round_percentage(percentage)
+            # 用户名在写入前解析（可能请求 PMA），避免在持有行锁时进行外部调用
             user_name = self._get_user_name(user_id)
 
-            # 检查是否已有徽章
-            existing = self._get_badge_by_user_course(user_id, course_id)
-
-            if existing:
-                # 更新徽章
-                badge_obj = CourseBadge.query.filter_by(
-                    user_id=user_id,
-                    course_id=course_id
-                ).first()
+            # INSERT ... ON CONFLICT DO UPDATE 完成发放或更新，替代 SELECT + 分支写入
+            stmt = pg_insert(CourseBadge).values(
+                badge_id=f"badge-{uuid.uuid4().hex[:8]}",
+                user_id=user_id,
+                user_name=user_name,
+                course_id=course_id,
+                course_title=course_title,
+                survey_id=survey_id,
+                score=score,
+                max_score=max_score,
+                percentage=pct,
+                attempt_count=1,
+                first_passed_at=now,
+                last_updated_at=now
+            )
+            excluded = stmt.excluded
+
+            # 只有新分数更高时才更新成绩（WHERE 比较的是冲突行的最新版本）
+            # WHERE 不成立时不返回行，但冲突行仍被锁定，随后只增加尝试次数
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['user_id', 'course_id'],
+                set_={
+                    'score': excluded.score,
+                    'max_score': excluded.max_score,
+                    'percentage': excluded.percentage,
+                    'attempt_count': func.coalesce(CourseBadge.attempt_count, 1) + 1,
+                    'last_updated_at': now,
+                },
+                where=excluded.score > func.coalesce(CourseBadge.score, 0)
+            )
+
+            # xmax = 0 表示本次是插入；直接返回列值（不构建 ORM 对象），由 _row_to_badge 组装返回字典
+            stmt = stmt.returning(
+                *CourseBadge.__table__.c,
+                literal_column('xmax = 0').label('inserted')
+            )
+
+            row = db.session.execute(stmt).mappings().one_or_none()
+            if row is not None:
+                is_new = row['inserted']
+                score_updated = True
+            else:
+                # 已有徽章且分数未提高：只增加尝试次数
+                table = CourseBadge.__table__
+                row = db.session.execute(
+                    update(table)
+                    .where(table.c.user_id == user_id, table.c.course_id == course_id)
+                    .values(attempt_count=func.coalesce(table.c.attempt_count, 1) + 1, last_updated_at=now)
+                    .returning(*table.c)
+                ).mappings().one()
+                is_new = False
+                score_updated = False
+            badge = self._row_to_badge(row)
+            db.session.commit()
 
-                old_score = existing.get('score', 0)
-                old_attempt = existing.get('attempt_count', 0)
-                new_attempt = old_attempt + 1
+            if is_new:
+                logger.info("🏅 发放新徽章: %s - %s: %s/%s", user_id, course_title, score, max_score)
+            elif score_updated:
+                logger.info("🏅 更新徽章分数: %s - %s: %s/%s", user_id, course_title, score, max_score)
+            else:
+                logger.debug("🏅 更新徽章尝试次数: %s - %s: 第 %s 次 (分数保持 %s)",
+                             user_id, course_title, badge['attempt_count'], badge['score'])
 
-                score_updated = False
+            return {
+                'success': True,
+                'badge': badge,
+                'is_new': is_new,
+                'score_updated': score_updated
+            }
 
-                # 只有新分数更高时才更新成绩
-                if score > old_score:
-                    # 更新分数和尝试次数
-                    badge_obj.score = score
-                    badge_obj.max_score = max_score
-                    badge_obj.percentage = int(percentage)
-                    badge_obj.attempt_count = new_attempt
-                    badge_obj.last_updated_at = now
-                    score_updated = True
-                    print(f"🏅 更新徽章分数: {user_id} - {course_title}: {old_score} -> {score}")
-                else:
-                    # 只更新尝试次数
-                    badge_obj.attempt_count = new_attempt
-                    badge_obj.last_updated_at = now
-                    print(f"🏅 更新徽章尝试次数: {user_id} - {course_title}: 第 {new_attempt} 次 (分数保持 {old_score})")
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("❌ 发放/更新徽章失败: %s", e)
+            return {'success': False, 'message': str(e)}
 
-                db.session.commit()
+    def issue_badges_batch(self, badges: list) -> list:
+        """
+        批量发放新徽章（单条多行 INSERT，已存在的徽章跳过）
 
-                # 返回更新后的徽章
-                badge = badge_obj.to_dict()
+        Args:
+            badges: [{'user_id', 'course_id', 'course_title', 'survey_id',
+                      'score', 'max_score', 'percentage'}, ...]
 
-                return {
-                    'success': True,
-                    'badge': badge,
-                    'is_new': False,
-                    'score_updated': score_updated
-                }
+        Returns:
+            实际新发放的徽章列表
+        """
+        if not badges:
+            return []
 
-            else:
-                # 创建新徽章
-                badge_id = f"badge-{uuid.uuid4().hex[:8]}"
-
-                badge_obj = CourseBadge(
-                    badge_id=badge_id,
-                    user_id=user_id,
-                    user_name=user_name,
-                    course_id=course_id,
-                    course_title=course_title,
-                    survey_id=survey_id,
-                    score=score,
-                    max_score=max_score,
-                    percentage=int(percentage),
-                    attempt_count=1,
-                    first_passed_at=now,
-                    last_updated_at=now
-                )
-
-                db.session.add(badge_obj)
-                db.session.commit()
-
-                badge = badge_obj.to_dict()
-                print(f"🏅 发放新徽章: {user_id} - {course_title}: {score}/{max_score}")
+        now = datetime.now()
+        names = self._get_user_names({b['user_id'] for b in badges})
+        rows = [
+            {
+                'badge_id': f"badge-{uuid.uuid4().hex[:8]}",
+                'user_id': b['user_id'],
+                'user_name': names.get(b['user_id'], UNKNOWN_USER_NAME),
+                'course_id': b['course_id'],
+                'course_title': b['course_title'],
+                'survey_id': b['survey_id'],
+                'score': b['score'],
+                'max_score': b['max_score'],
+                'percentage': _round_percentage(b['percentage']),
+                'attempt_count': 1,
+                'first_passed_at': now,
+                'last_updated_at': now,
+            }
+            for b in badges
+        ]
 
-                return {
-                    'success': True,
-                    'badge': badge,
-                    'is_new': True,
-                    'score_updated': True
-                }
+        stmt = pg_insert(CourseBadge.__table__).values(rows).on_conflict_do_nothing(
+            index_elements=['user_id', 'course_id']
+        ).returning(*CourseBadge.__table__.c)
 
-        except Exception as e:
+        try:
+            issued = [self._row_to_badge(row) for row in db.session.execute(stmt).mappings()]
+            db.session.commit()
+        except Exception:
             db.session.rollback()
-            print(f"❌ 发放/更新徽章失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return {'success': False, 'message': str(e)}
+            raise
+
+        logger.info("🏅 批量发放徽章: %s/%s", len(issued), len(badges))
+        return issued
+
+    @staticmethod
+    def _row_to_badge(row) -> dict:
+        """将 RETURNING 的行映射转换为徽章字典（格式与 CourseBadge.to_dict() 一致）"""
+        first_passed_at = row['first_passed_at']
+        last_updated_at = row['last_updated_at']
+        return {
+            'badge_id': row['badge_id'],
+            'user_id': row['user_id'],
+            'user_name': row['user_name'] or '',
+            'course_id': row['course_id'],
+            'course_title': row['course_title'] or '',
+            'survey_id': row['survey_id'] or '',
+            'score': row['score'] or 0,
+            'max_score': row['max_score'] or 0,
+            'percentage': row['percentage'] or 0,
+            'attempt_count': row['attempt_count'] or 1,
+            'first_passed_at': first_passed_at.isoformat() if first_passed_at else '',
+            'last_updated_at': last_updated_at.isoformat() if last_updated_at else '',
+        }
+
+    def refresh_user_names(self, user_ids: list | None = None) -> int:
+        """
+        批量刷新徽章中冗余存储的用户名
+
+        Args:
+            user_ids: 需要刷新的用户ID列表，不传则刷新所有拥有徽章的用户
+
+        Returns:
+            更新的徽章数量
+        """
+        if user_ids is None:
+            user_ids = [uid for (uid,) in db.session.query(CourseBadge.user_id).distinct()]
+
+        for user_id in user_ids:
+            self.invalidate_user_name(user_id)
+        names = self._get_user_names(user_ids)
+
+        updated = 0
+        for user_id, name in names.items():
+            if name == UNKNOWN_USER_NAME:
+                continue
+            # 每个用户一条 UPDATE，只改动用户名已变化的行
+            updated += CourseBadge.query.filter(
+                CourseBadge.user_id == user_id,
+                db.or_(CourseBadge.user_name.is_(None), CourseBadge.user_name != name)
+            ).update({'user_name': name}, synchronize_session=False)
+
+        db.session.commit()
+        return updated
 
     def get_user_badges(self, user_id: str) -> list:
         """
@@ -208,7 +381,7 @@ class BadgeService:
             return [badge.to_dict() for badge in badges]
 
         except Exception as e:
-            print(f"❌ 获取用户徽章失败: {str(e)}")
+            logger.error("❌ 获取用户徽章失败: %s", e)
             return []
 
     def get_badge_by_id(self, badge_id: str) -> dict | None:
@@ -229,7 +402,7 @@ class BadgeService:
             return None
 
         except Exception as e:
-            print(f"❌ 获取徽章详情失败: {str(e)}")
+            logger.error("❌ 获取徽章详情失败: %s", e)
             return None
 
     def get_course_by_survey_id(self, survey_id: str) -> dict | None:
@@ -243,54 +416,71 @@ class BadgeService:
             {'course_id': ..., 'course_title': ...} 或 None
         """
         try:
-            from app.services.course_service import course_service
+            from app.models.course import Course
 
-            courses = course_service.get_all_courses()
-            for course in courses:
-                quiz = course.get('quiz')
-                if quiz and quiz.get('survey_id') == survey_id:
-                    return {
-                        'course_id': course.get('id'),
-                        'course_title': course.get('title', '未知课程')
-                    }
+            # 直接按 quiz_survey_id 查询，与原先按 order 遍历全部课程取第一个匹配项等价
+            row = db.session.query(Course.id, Course.title).filter(
+                Course.quiz_survey_id == survey_id
+            ).order_by(Course.order).first()
 
+            if row:
+                return {
+                    'course_id': row.id,
+                    'course_title': row.title or '未知课程'
+                }
             return None
 
         except Exception as e:
-            print(f"❌ 根据测验ID获取课程失败: {str(e)}")
+            logger.error("❌ 根据测验ID获取课程失败: %s", e)
             return None
 
 
-# 单例实例 - 延迟初始化
+# 单例实例 - 延迟初始化（模块级实例即单例，锁只在尚未创建时获取）
 _badge_service = None
 _badge_service_init_error = None
+_badge_service_lock = threading.Lock()
 
 
 def get_badge_service():
     """获取 BadgeService 实例（延迟初始化）"""
     global _badge_service, _badge_service_init_error
 
-    if _badge_service is not None:
-        return _badge_service
+    svc = _badge_service
+    if svc is not None:
+        return svc
 
-    if _badge_service_init_error is not None:
-        # 已经尝试过初始化但失败了，抛出保存的错误
-        raise _badge_service_init_error
+    with _badge_service_lock:
+        if _badge_service is not None:
+            return _badge_service
 
-    try:
-        _badge_service = BadgeService()
-        return _badge_service
-    except Exception as e:
-        _badge_service_init_error = e
-        raise
+        if _badge_service_init_error is not None:
+            # 已经尝试过初始化但失败了，抛出保存的错误
+            raise _badge_service_init_error
+
+        try:
+            _badge_service = BadgeService()
+            return _badge_service
+        except Exception as e:
+            _badge_service_init_error = e
+            raise
 
 
 # 为了向后兼容，提供一个属性访问器
 # 注意：直接使用 badge_service 会在首次访问时初始化
 class _BadgeServiceProxy:
-    """代理类，实现延迟初始化的向后兼容"""
+    """代理类，实现延迟初始化的向后兼容
+
+    首次解析后：模块属性 badge_service 替换为真实实例（之后的导入不再经过代理）；
+    已经导入代理的模块，其方法访问会缓存到代理实例上，不再触发 __getattr__
+    """
     def __getattr__(self, name):
-        return getattr(get_badge_service(), name)
+        svc = get_badge_service()
+        globals()['badge_service'] = svc
+        value = getattr(svc, name)
+        if callable(value):
+            # 绑定方法缓存到实例字典，后续访问直接命中，不再走 __getattr__
+            self.__dict__[name] = value
+        return value
 
 
 badge_service = _BadgeServiceProxy()
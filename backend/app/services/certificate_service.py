@@ -3,34 +3,45 @@
 管理培训证书的颁发、存储和查询
 """
 from datetime import datetime
-import uuid
-import json
+from operator import itemgetter
+import logging
+import os
 import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+from sqlalchemy import func, insert, select
 
 from app.models.base import db
 from app.models.certificate import Certificate
 
+logger = logging.getLogger(__name__)
+# 可单独调整证书模块的日志级别（如 CERTIFICATE_LOG_LEVEL=DEBUG 排查未通过原因），默认沿用全局 LOG_LEVEL
+if os.getenv('CERTIFICATE_LOG_LEVEL'):
+    logger.setLevel(os.getenv('CERTIFICATE_LOG_LEVEL').upper())
 
-class CertificateService:
-    """证书管理服务 - 管理证书数据库表"""
+# 颁发时在后台线程预取 PMA 员工列表（外部 HTTP），与数据库查询并行；设为 0 时按顺序执行便于排查
+PARALLEL_PRELOAD = os.getenv('CERTIFICATE_PARALLEL_PRELOAD', '1') != '0'
+_prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cert-prefetch')
 
-    _instance = None
-    _lock = threading.Lock()
 
-    def __new__(cls):
-        if cls._instance is None:
-            with cls._lock:
-                if cls._instance is None:
-                    cls._instance = super(CertificateService, cls).__new__(cls)
-                    cls._instance._initialized = False
-        return cls._instance
+def _parse_set(value) -> set:
+    """将进度中的列表字段（list / JSON 字符串 / dict / None）统一解析为集合"""
+    if isinstance(value, str):
+        try:
+            value = orjson.loads(value)
+        except orjson.JSONDecodeError:
+            return set()
+    if isinstance(value, (list, tuple, set, frozenset, dict)):
+        return set(value)
+    return set()
 
-    def __init__(self):
-        if self._initialized:
-            return
 
-        self._initialized = True
-        print("✅ CertificateService 初始化成功")
+class CertificateService:
+    """证书管理服务 - 管理证书数据库表"""
+
+    def __init__(self):
+        logger.info("✅ CertificateService 初始化成功")
 
     def issue_certificates_for_syllabus(
         self,
@@ -62,50 +73,71 @@ class CertificateService:
 
             syllabus_name = syllabus.get('name', '未知课程表')
 
-            # 获取所有用户进度
-            all_progress = progress_service._get_all_user_progress()
+            # 员工姓名/公司来自外部 API，提前在后台拉取（结果进入员工列表缓存）
+            employees_prefetch = None
+            if PARALLEL_PRELOAD:
+                from app.services.pma_api_service import get_all_employees
+                employees_prefetch = _prefetch_pool.submit(get_all_employees)
 
-            # 获取课程表中所有课程的测验信息
-            course_quizzes = self._get_syllabus_course_quizzes(syllabus)
+            # 只读取在该课程表中有 XP 记录的用户进度（数据库端预过滤）
+            all_progress = progress_service.get_progress_for_syllabus(syllabus_id)
+
+            # 获取课程表中所有课程的详情和测验信息（一次遍历）
+            course_details, course_quizzes = self._get_syllabus_courses(syllabus)
             if not course_quizzes:
                 return {'success': False, 'message': '课程表中没有测验'}
 
             # 批量预加载分数和问题数据（减少 API 调用次数）
             from app.services.sheets_service import sheets_service
-            print("📊 预加载分数和问题数据...")
-            all_scores = sheets_service.get_all_scores()
+            logger.debug("📊 预加载分数和问题数据...")
+            best_scores = self._build_best_score_index(sheets_service.get_all_scores())
             survey_ids = list(set(q['survey_id'] for q in course_quizzes))
-            all_questions = {
-                sid: sheets_service.get_questions_by_survey(sid)
-                for sid in survey_ids
-            }
-            print(f"✅ 预加载完成: {len(all_scores)} 条分数记录, {len(survey_ids)} 个测验问题")
-
-            # 过滤通过所有测验的用户
+            # 所有测验的题目一次查询取回，不再逐个测验查询
+            all_questions = sheets_service.get_questions_by_surveys(survey_ids)
+            # 证书只需要每个测验通过后可得的 XP（每题 +10），一次算好
+            xp_per_survey = {sid: len(questions) * 10 for sid, questions in all_questions.items()}
+            logger.info("✅ 预加载完成: %s 条最佳成绩, %s 个测验问题", len(best_scores), len(survey_ids))
+
+            # 过滤通过所有测验的用户：只遍历在该课程表获得过 XP 的进度记录
+            required_surveys = frozenset(survey_ids)
+            survey_titles = {}  # 同一测验可能被多门课程引用
+            for q in course_quizzes:
+                survey_titles.setdefault(q['survey_id'], []).append(q['course_title'])
+            candidates = (
+                (p, syllabus_xp) for p in all_progress
+                if (syllabus_xp := p.get('xpBySyllabus', {}).get(syllabus_id, 0)) > 0
+            )
             participants = []
             not_passed_count = 0
-            for p in all_progress:
-                xp_by_syllabus = p.get('xpBySyllabus', {})
-                syllabus_xp = xp_by_syllabus.get(syllabus_id, 0)
-                if syllabus_xp > 0:
-                    user_id = p.get('user_id')
-                    # 检查是否通过所有测验（传入用户进度数据）
-                    passed_all, failed_courses = self._check_user_passed_all_quizzes(
-                        user_id, course_quizzes, user_progress=p
-                    )
-                    if passed_all:
-                        # 计算实际测验分数（使用预加载数据）
-                        user_quiz_scores = self._calculate_user_quiz_total(user_id, course_quizzes, all_scores)
-                        participants.append({
-                            'user_id': user_id,
-                            'score': user_quiz_scores['total_score'],      # 实际得分
-                            'max_score': user_quiz_scores['max_score'],    # 满分
-                            'xp_earned': syllabus_xp,                      # XP 经验值
-                            'user_progress': p  # 保存完整的用户进度数据
-                        })
-                    else:
-                        not_passed_count += 1
-                        print(f"⏭️ 用户 {user_id} 未通过所有测验，跳过: {failed_courses}")
+            # 未通过的课程名只用于调试日志，未开启 DEBUG 时不整理
+            collect_failures = logger.isEnabledFor(logging.DEBUG)
+            for p, syllabus_xp in candidates:
+                user_id = p.get('user_id')
+                # 进度中的列表字段每个用户只解析一次
+                passed_set = _parse_set(p.get('firstPassedQuizzes'))
+                # 检查是否通过所有测验
+                passed_all, failed_courses = self._check_user_passed_all_quizzes(
+                    user_id, required_surveys, survey_titles, passed_set, collect_failures
+                )
+                if not passed_all:
+                    not_passed_count += 1
+                    logger.debug("⏭️ 用户 %s 未通过所有测验，跳过: %s", user_id, failed_courses)
+                    continue
+
+                # 计算实际测验分数（使用预加载数据）
+                user_quiz_scores = self._calculate_user_quiz_total(user_id, course_quizzes, best_scores)
+                # (用户ID, 实际得分, 满分, XP 经验值, 已通过的测验, 已完成的课程)
+                participants.append((
+                    user_id,
+                    user_quiz_scores['total_score'],
+                    user_quiz_scores['max_score'],
+                    syllabus_xp,
+                    passed_set,
+                    _parse_set(p.get('coursesCompleted'))
+                ))
+
+            logger.info("📋 课程表 %s: %s 人通过所有测验, %s 人未通过",
+                        syllabus_id, len(participants), not_passed_count)
 
             if not participants:
                 return {
@@ -115,53 +147,50 @@ class CertificateService:
                 }
 
             # 按分数排序
-            participants.sort(key=lambda x: x['score'], reverse=True)
+            participants.sort(key=itemgetter(1), reverse=True)
             total_participants = len(participants)
 
-            # 获取用户信息映射
-            user_map = progress_service._get_user_map()
+            # 等待后台预取完成，随后的员工查询直接命中缓存
+            if employees_prefetch is not None:
+                try:
+                    employees_prefetch.result()
+                except Exception as e:
+                    logger.warning("⚠️ 预取员工列表失败: %s", e)
 
-            # 获取课程详情用于记录各课程得分
-            course_details = self._get_course_details_for_syllabus(syllabus)
+            # 只查询参与者的姓名和公司（不再拉取全部用户列表）
+            user_map, company_map = self._get_user_profiles([p[0] for p in participants])
 
             # 删除该课程表的所有旧证书（重新颁发会更新排名和分数）
+            # 删除与新证书写入在同一事务中，循环结束后统一提交
             deleted_count = self._delete_certificates_for_syllabus(syllabus_id)
-            if deleted_count > 0:
-                print(f"🗑️ 已删除 {deleted_count} 张旧证书")
 
             # 颁发证书
             certificates = []
+            cert_rows = []
             now = datetime.now()
+            # 一次性生成所有证书ID的随机后缀（每张 4 字节 = 8 位十六进制，与原格式一致）
+            id_suffixes = os.urandom(4 * total_participants).hex()
 
-            for rank, participant in enumerate(participants, 1):
-                user_id = participant['user_id']
-
-                user_name = user_map.get(user_id, '未知用户')
-                user_company = self._get_user_company(user_id)
-
+            for rank, (user_id, score, max_score, xp_earned, passed_set, completed_set) in enumerate(
+                participants, 1
+            ):
                 # 获取用户在各课程的得分（使用预加载数据）
-                user_progress = participant.get('user_progress', {})
                 course_scores = self._get_user_course_scores(
-                    user_id, syllabus, course_details, user_progress,
-                    all_scores, all_questions
+                    user_id, course_details, passed_set, completed_set,
+                    best_scores, xp_per_survey
                 )
 
-                # 计算百分比
-                percentage = 0
-                if participant['max_score'] > 0:
-                    percentage = round(participant['score'] / participant['max_score'] * 100)
-
                 certificate = {
-                    'certificate_id': f"cert-{uuid.uuid4().hex[:8]}",
+                    'certificate_id': f"cert-{id_suffixes[rank * 8 - 8:rank * 8]}",
                     'user_id': user_id,
-                    'user_name': user_name,
-                    'user_company': user_company,
+                    'user_name': user_map.get(user_id, '未知用户'),
+                    'user_company': company_map.get(user_id, ''),
                     'syllabus_id': syllabus_id,
                     'syllabus_name': syllabus_name,
-                    'score': participant['score'],           # 实际得分
-                    'max_score': participant['max_score'],   # 满分
-                    'percentage': percentage,                # 百分比评分
-                    'xp_earned': participant['xp_earned'],   # XP 经验值
+                    'score': score,                          # 实际得分
+                    'max_score': max_score,                  # 满分
+                    'percentage': round(score / max_score * 100) if max_score > 0 else 0,  # 百分比评分
+                    'xp_earned': xp_earned,                  # XP 经验值
                     'rank': rank,
                     'total_participants': total_participants,
                     'course_scores': course_scores,
@@ -169,10 +198,17 @@ class CertificateService:
                     'issued_by': issued_by
                 }
 
-                # 保存到数据库
-                self._save_certificate(certificate)
+                cert_rows.append(self._certificate_to_row(certificate))
                 certificates.append(certificate)
 
+            # 一次性批量插入所有证书（不构建 ORM 对象）并提交（含旧证书删除）
+            db.session.execute(insert(Certificate), cert_rows)
+            db.session.commit()
+            # 释放本次颁发过程中加载进会话的对象（如用户进度），避免大批量颁发后内存居高不下
+            db.session.expunge_all()
+            if deleted_count > 0:
+                logger.info("🗑️ 已删除 %s 张旧证书", deleted_count)
+
             return {
                 'success': True,
                 'certificates_issued': len(certificates),
@@ -183,13 +219,12 @@ class CertificateService:
             }
 
         except Exception as e:
-            print(f"❌ 颁发证书失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            db.session.rollback()
+            logger.exception("❌ 颁发证书失败: %s", e)
             return {'success': False, 'message': str(e)}
 
-    def _save_certificate(self, certificate: dict):
-        """保存证书到数据库"""
+    def _certificate_to_row(self, certificate: dict) -> dict:
+        """由证书字典构建 certificates 表的行数据（用于批量插入）"""
         # Handle issued_at: could be datetime object or ISO string
         issued_at = certificate.get('issued_at')
         if isinstance(issued_at, str):
@@ -203,71 +238,85 @@ class CertificateService:
         # Handle course_scores: must be JSON string for Text column
         course_scores = certificate.get('course_scores', {})
         if isinstance(course_scores, (dict, list)):
-            course_scores = json.dumps(course_scores, ensure_ascii=False)
-
-        cert_obj = Certificate(
-            certificate_id=certificate.get('certificate_id', ''),
-            user_id=certificate.get('user_id', ''),
-            user_name=certificate.get('user_name', ''),
-            user_company=certificate.get('user_company', ''),
-            syllabus_id=certificate.get('syllabus_id', ''),
-            syllabus_name=certificate.get('syllabus_name', ''),
-            score=certificate.get('score', 0),
-            max_score=certificate.get('max_score', 0),
-            percentage=certificate.get('percentage', 0),
-            xp_earned=certificate.get('xp_earned', 0),
-            rank=certificate.get('rank', 0),
-            total_participants=certificate.get('total_participants', 0),
-            course_scores=course_scores,
-            issued_at=issued_at,
-            issued_by=certificate.get('issued_by', '')
-        )
-        db.session.add(cert_obj)
-        db.session.commit()
+            # orjson 直接输出 UTF-8（等价于 ensure_ascii=False）
+            course_scores = orjson.dumps(course_scores, option=orjson.OPT_NON_STR_KEYS).decode()
+
+        return {
+            'certificate_id': certificate.get('certificate_id', ''),
+            'user_id': certificate.get('user_id', ''),
+            'user_name': certificate.get('user_name', ''),
+            'user_company': certificate.get('user_company', ''),
+            'syllabus_id': certificate.get('syllabus_id', ''),
+            'syllabus_name': certificate.get('syllabus_name', ''),
+            'score': certificate.get('score', 0),
+            'max_score': certificate.get('max_score', 0),
+            'percentage': certificate.get('percentage', 0),
+            'xp_earned': certificate.get('xp_earned', 0),
+            'rank': certificate.get('rank', 0),
+            'total_participants': certificate.get('total_participants', 0),
+            'course_scores': course_scores,
+            'issued_at': issued_at,
+            'issued_by': certificate.get('issued_by', '')
+        }
+
+    @staticmethod
+    def _row_to_certificate(row) -> dict:
+        """将查询返回的行映射转换为证书字典（格式与 Certificate.to_dict() 一致）"""
+        course_scores = row['course_scores']
+        try:
+            course_scores = orjson.loads(course_scores) if course_scores else {}
+        except orjson.JSONDecodeError:
+            course_scores = {}
+        issued_at = row['issued_at']
+        return {
+            'certificate_id': row['certificate_id'],
+            'user_id': row['user_id'],
+            'user_name': row['user_name'] or '',
+            'user_company': row['user_company'] or '',
+            'syllabus_id': row['syllabus_id'],
+            'syllabus_name': row['syllabus_name'] or '',
+            'score': row['score'] or 0,
+            'max_score': row['max_score'] or 0,
+            'percentage': row['percentage'] or 0,
+            'xp_earned': row['xp_earned'] or 0,
+            'rank': row['rank'] or 0,
+            'total_participants': row['total_participants'] or 0,
+            'course_scores': course_scores,
+            'issued_at': issued_at.isoformat() if issued_at else '',
+            'issued_by': row['issued_by'] or '',
+        }
 
     def _get_existing_certificates_for_syllabus(self, syllabus_id: str) -> list:
-        """获取课程表已颁发的证书"""
+        """获取课程表已颁发的证书（按排名排序，直接读取列数据，不实例化 ORM 对象）"""
         try:
-            certificates = Certificate.query.filter_by(syllabus_id=syllabus_id).all()
-            return [cert.to_dict() for cert in certificates]
+            table = Certificate.__table__
+            stmt = select(table).where(table.c.syllabus_id == syllabus_id).order_by(table.c.rank)
+            return [self._row_to_certificate(row) for row in db.session.execute(stmt).mappings()]
         except Exception:
             return []
 
-    def _delete_certificates_for_syllabus(self, syllabus_id: str) -> int:
-        """删除课程表的所有证书"""
-        try:
-            deleted_count = Certificate.query.filter_by(syllabus_id=syllabus_id).delete()
-            db.session.commit()
-            return deleted_count
-        except Exception as e:
-            print(f"❌ 删除证书失败: {str(e)}")
-            db.session.rollback()
-            return 0
-
-    def _get_course_details_for_syllabus(self, syllabus: dict) -> dict:
-        """获取课程表中的课程详情"""
-        from app.services.course_service import course_service
-
-        course_details = {}
-        course_sequence = syllabus.get('course_sequence', [])
-
-        for item in course_sequence:
-            course_id = item.get('course_id')
-            course = course_service.get_course(course_id)
-            if course:
-                course_details[course_id] = {
-                    'title': course.get('title', '未知课程'),
-                    'survey_id': course.get('quiz', {}).get('survey_id')
-                }
+    def _count_certificates_for_syllabus(self, syllabus_id: str) -> int:
+        """统计课程表已颁发的证书数量"""
+        stmt = select(func.count()).select_from(Certificate).where(
+            Certificate.syllabus_id == syllabus_id
+        )
+        return db.session.execute(stmt).scalar_one()
 
-        return course_details
+    def _delete_certificates_for_syllabus(self, syllabus_id: str) -> int:
+        """删除课程表的所有证书（不提交，由调用方与新证书写入一起提交）"""
+        # synchronize_session=False：直接发出 DELETE，不把待删除行加载到会话中
+        return Certificate.query.filter_by(syllabus_id=syllabus_id).delete(
+            synchronize_session=False
+        )
 
-    def _get_syllabus_course_quizzes(self, syllabus: dict) -> list:
+    def _get_syllabus_courses(self, syllabus: dict) -> tuple:
         """
-        获取课程表中所有课程的测验信息
+        一次遍历课程表，获取课程详情和测验信息（每门课程只查询一次）
 
         Returns:
-            [
+            (course_details, course_quizzes)
+            course_details: {course_id: {'title': '课程名称', 'survey_id': 'survey-xxx'}}
+            course_quizzes: [
                 {
                     'course_id': 'xxx',
                     'course_title': '课程名称',
@@ -279,87 +328,91 @@ class CertificateService:
         """
         from app.services.course_service import course_service
 
+        course_details = {}
         course_quizzes = []
         course_sequence = syllabus.get('course_sequence', [])
+        # 课程表中的所有课程一次查询取回（重复的课程也只查询一次）
+        courses = course_service.get_courses_by_ids(item.get('course_id') for item in course_sequence)
 
         for item in course_sequence:
             course_id = item.get('course_id')
-            course = course_service.get_course(course_id)
-            if course and course.get('quiz'):
-                quiz = course['quiz']
-                survey_id = quiz.get('survey_id')
-                if survey_id:
-                    course_quizzes.append({
-                        'course_id': course_id,
-                        'course_title': course.get('title', '未知课程'),
-                        'survey_id': survey_id,
-                        'pass_score': quiz.get('pass_score', 60)  # 默认 60%
-                    })
-
-        return course_quizzes
-
-    def _check_user_passed_all_quizzes(self, user_id: str, course_quizzes: list, user_progress: dict = None) -> tuple:
+            course = courses.get(course_id)
+            if not course:
+                continue
+
+            quiz = course.get('quiz') or {}
+            course_title = course.get('title', '未知课程')
+            course_details[course_id] = {
+                'title': course_title,
+                'survey_id': quiz.get('survey_id')
+            }
+
+            survey_id = quiz.get('survey_id')
+            if survey_id:
+                course_quizzes.append({
+                    'course_id': course_id,
+                    'course_title': course_title,
+                    'survey_id': survey_id,
+                    'pass_score': quiz.get('pass_score', 60)  # 默认 60%
+                })
+
+        return course_details, course_quizzes
+
+    def _check_user_passed_all_quizzes(
+        self, user_id: str, required_surveys: frozenset, survey_titles: dict,
+        passed_quizzes: set, collect_failures: bool = True
+    ) -> tuple:
         """
         检查用户是否通过所有测验
 
         Args:
             user_id: 用户ID
-            course_quizzes: 课程测验列表
-            user_progress: 用户进度数据（可选，包含 first_passed_quizzes）
+            required_surveys: 需要通过的测验ID集合（循环外预先计算）
+            survey_titles: {survey_id: [课程名称, ...]}，仅用于整理未通过的课程名
+            passed_quizzes: 用户已通过的测验ID集合（firstPassedQuizzes）
+            collect_failures: 为 False 时只判断是否全部通过，不整理未通过的课程名
 
         Returns:
             (passed_all: bool, failed_courses: list)
         """
-        failed_courses = []
-
-        # 从用户进度获取已通过的测验列表（字段名是 camelCase: firstPassedQuizzes）
-        passed_quizzes = set()
-        if user_progress:
-            first_passed = user_progress.get('firstPassedQuizzes', [])
-            if isinstance(first_passed, str):
-                try:
-                    import json
-                    first_passed = json.loads(first_passed)
-                except:
-                    first_passed = []
-            passed_quizzes = set(first_passed) if first_passed else set()
-
-        print(f"📋 检查用户 {user_id} 的测验通过情况，共 {len(course_quizzes)} 个测验")
-        print(f"  📝 用户已通过的测验: {passed_quizzes}")
-
-        for quiz_info in course_quizzes:
-            survey_id = quiz_info['survey_id']
-            course_title = quiz_info['course_title']
-
-            print(f"  🔍 检查课程 [{course_title}] survey_id={survey_id}")
-
-            if survey_id in passed_quizzes:
-                print(f"  ✅ 已通过（在 first_passed_quizzes 中）")
-            else:
-                print(f"  ❌ 未通过（不在 first_passed_quizzes 中）")
-                failed_courses.append(f"{course_title}(未通过)")
-
-        passed_all = len(failed_courses) == 0
-        return passed_all, failed_courses
-
-    def _get_best_score_from_cache(self, user_id: str, survey_id: str, all_scores: list) -> dict | None:
-        """从预加载的分数数据中获取用户最佳成绩"""
-        user_scores = [
-            s for s in all_scores
-            if s.get('user_id') == user_id and s.get('survey_id') == survey_id
+        if not collect_failures:
+            # 子集判断遇到第一个未通过的测验即返回，不构建差集
+            return required_surveys <= passed_quizzes, []
+
+        # 一次集合差运算判断是否全部通过，只有未通过时才整理未通过的课程名
+        missing = required_surveys - passed_quizzes
+        logger.debug("📋 检查用户 %s 的测验通过情况，共 %s 个测验，未通过: %s",
+                     user_id, len(required_surveys), missing or '无')
+        if not missing:
+            return True, []
+
+        failed_courses = [
+            f"{title}(未通过)" for survey_id in missing for title in survey_titles[survey_id]
         ]
-        if not user_scores:
-            return None
-        return max(user_scores, key=lambda x: x.get('total_score', 0))
-
-    def _calculate_user_quiz_total(self, user_id: str, course_quizzes: list, all_scores: list) -> dict:
+        return False, failed_courses
+
+    def _build_best_score_index(self, all_scores: list) -> dict:
+        """一次遍历预加载的分数数据，建立 {(user_id, survey_id): 最佳成绩} 索引"""
+        best_scores = {}
+        for s in all_scores:
+            key = (s.get('user_id'), s.get('survey_id'))
+            current = best_scores.get(key)
+            if current is None or s.get('total_score', 0) > current.get('total_score', 0):
+                best_scores[key] = s
+        return best_scores
+
+    def _get_best_score_from_cache(self, user_id: str, survey_id: str, best_scores: dict) -> dict | None:
+        """从最佳成绩索引中获取用户最佳成绩"""
+        return best_scores.get((user_id, survey_id))
+
+    def _calculate_user_quiz_total(self, user_id: str, course_quizzes: list, best_scores: dict) -> dict:
         """计算用户在所有测验的总分（使用预加载数据）"""
         total_score = 0
         max_score = 0
 
         for quiz_info in course_quizzes:
             survey_id = quiz_info['survey_id']
-            best = self._get_best_score_from_cache(user_id, survey_id, all_scores)
+            best = self._get_best_score_from_cache(user_id, survey_id, best_scores)
             if best:
                 total_score += best.get('total_score', 0)
                 max_score += best.get('max_score', 0)
@@ -367,118 +420,100 @@ class CertificateService:
         return {'total_score': total_score, 'max_score': max_score}
 
     def _get_user_course_scores(
-        self, user_id: str, syllabus: dict, course_details: dict,
-        user_progress: dict = None, all_scores: list = None, all_questions: dict = None
+        self, user_id: str, course_details: dict,
+        passed_quizzes: set, completed_courses: set,
+        best_scores: dict, xp_per_survey: dict
     ) -> dict:
-        """获取用户在课程表各课程的实际测验分数、百分比和 XP（使用预加载数据）"""
-        course_scores = {}
-        course_sequence = syllabus.get('course_sequence', [])
-
-        # 获取用户已完成的课程列表
-        completed_courses = set()
-        passed_quizzes = set()
-        if user_progress:
-            courses_completed = user_progress.get('coursesCompleted', [])
-            if isinstance(courses_completed, str):
-                try:
-                    courses_completed = json.loads(courses_completed)
-                except:
-                    courses_completed = []
-            if isinstance(courses_completed, list):
-                completed_courses = set(courses_completed)
-
-            first_passed = user_progress.get('firstPassedQuizzes', [])
-            if isinstance(first_passed, str):
-                try:
-                    first_passed = json.loads(first_passed)
-                except:
-                    first_passed = []
-            if isinstance(first_passed, list):
-                passed_quizzes = set(first_passed)
+        """获取用户在课程表各课程的实际测验分数、百分比和 XP（使用预加载数据）
 
-        for item in course_sequence:
-            course_id = item.get('course_id')
-            if course_id not in course_details:
-                continue
+        course_details 按课程表顺序构建，直接遍历即可
+        """
+        course_scores = {}
 
-            course_info = course_details[course_id]
+        for course_id, course_info in course_details.items():
             survey_id = course_info.get('survey_id')
-            course_title = course_info.get('title', '未知课程')
-
-            score_data = {
-                'name': course_title,
-                'score': 0,
-                'max_score': 0,
-                'percentage': 0,
-                'xp_earned': 0
+            best_score = best_scores.get((user_id, survey_id)) if survey_id else None
+
+            score = max_score = percentage = 0
+            if best_score:
+                score = best_score.get('total_score', 0)
+                max_score = best_score.get('max_score', 0)
+                if max_score > 0:
+                    percentage = round(score / max_score * 100)
+
+            # XP：阅读完成 +50，通过测验每题 +10
+            xp = (50 if course_id in completed_courses else 0) + (
+                xp_per_survey.get(survey_id, 0) if survey_id in passed_quizzes else 0
+            )
+
+            course_scores[course_id] = {
+                'name': course_info.get('title', '未知课程'),
+                'score': score,
+                'max_score': max_score,
+                'percentage': percentage,
+                'xp_earned': xp
             }
 
-            # 计算 XP
-            xp = 0
-            if course_id in completed_courses:
-                xp += 50  # 阅读完成 +50 XP
+        return course_scores
 
-            if survey_id:
-                # 从预加载数据获取实际测验分数
-                best_score = self._get_best_score_from_cache(user_id, survey_id, all_scores)
-                if best_score:
-                    score_data['score'] = best_score.get('total_score', 0)
-                    score_data['max_score'] = best_score.get('max_score', 0)
-                    if score_data['max_score'] > 0:
-                        score_data['percentage'] = round(
-                            score_data['score'] / score_data['max_score'] * 100
-                        )
-
-                # 通过测验的 XP
-                if survey_id in passed_quizzes:
-                    questions = all_questions.get(survey_id, []) if all_questions else []
-                    xp += len(questions) * 10
-
-            score_data['xp_earned'] = xp
-            course_scores[course_id] = score_data
+    def _get_user_profiles(self, user_ids: list) -> tuple:
+        """批量获取参与者的姓名和公司：员工一次遍历员工列表，客人一次 IN 查询
 
-        return course_scores
+        Returns:
+            (names, companies): 两个 {user_id: 值} 映射
+        """
+        from app.services.pma_api_service import get_employees_by_ids
+        from app.services.sheets_service import sheets_service
+
+        employee_ids = [uid for uid in user_ids if uid.startswith('emp_')]
+        guest_ids = [uid for uid in user_ids if not uid.startswith('emp_')]
+        names = {}
+        companies = {}
 
-    def _get_user_company(self, user_id: str) -> str:
-        """获取用户公司"""
         try:
-            if user_id.startswith('emp_'):
-                # 员工用户
-                from app.services.pma_api_service import get_employee_by_id
-                emp_id = user_id[4:]  # 去掉 emp_ 前缀
-                emp = get_employee_by_id(emp_id)
-                if emp:
-                    return emp.get('company', '') or emp.get('department', '') or 'SP8D'
-            else:
-                # 客人用户
-                from app.services.sheets_service import sheets_service
-                user = sheets_service.get_user_by_id(user_id)
-                if user:
-                    return user.get('company', '')
+            # get_employees_by_ids 会把未精确匹配的 emp_{id} 按 emp_ovs_{id} 匹配
+            for uid, emp in get_employees_by_ids(employee_ids).items():
+                names[uid] = emp.get('name') or emp.get('real_name') or '未知'
+                companies[uid] = emp.get('company', '') or emp.get('department', '') or 'SP8D'
         except Exception:
             pass
-        return ''
 
-    def get_user_certificates(self, user_id: str) -> list:
+        try:
+            for uid, user in sheets_service.get_users_by_ids(guest_ids).items():
+                names[uid] = user.get('name', '未知')
+                companies[uid] = user.get('company', '')
+        except Exception:
+            pass
+
+        return names, companies
+
+    def get_user_certificates(self, user_id: str, limit: int | None = None, offset: int = 0) -> list:
         """
-        获取用户的所有证书
+        获取用户的证书（按颁发时间倒序）
 
         Args:
             user_id: 用户ID
+            limit: 最多返回条数，None 表示不限制
+            offset: 跳过的条数
 
         Returns:
             证书列表
         """
         try:
-            certificates = Certificate.query.filter_by(user_id=user_id).all()
-            cert_list = [cert.to_dict() for cert in certificates]
-
-            # 按颁发时间倒序
-            cert_list.sort(key=lambda x: x.get('issued_at', ''), reverse=True)
-            return cert_list
+            # 排序和分页都由数据库完成（走 ix_certificate_user_issued 索引）
+            # 直接读取列数据，不实例化 ORM 对象、不进入会话的 identity map
+            table = Certificate.__table__
+            stmt = select(table).where(table.c.user_id == user_id).order_by(
+                table.c.issued_at.desc()
+            )
+            if offset:
+                stmt = stmt.offset(offset)
+            if limit is not None:
+                stmt = stmt.limit(limit)
+            return [self._row_to_certificate(row) for row in db.session.execute(stmt).mappings()]
 
         except Exception as e:
-            print(f"❌ 获取用户证书失败: {str(e)}")
+            logger.error("❌ 获取用户证书失败: %s", e)
             return []
 
     def get_certificate_by_id(self, certificate_id: str) -> dict | None:
@@ -498,19 +533,23 @@ class CertificateService:
             return None
 
         except Exception as e:
-            print(f"❌ 获取证书详情失败: {str(e)}")
+            logger.error("❌ 获取证书详情失败: %s", e)
             return None
 
-    def get_syllabus_certificate_stats(self, syllabus_id: str) -> dict:
+    def get_syllabus_certificate_stats(self, syllabus_id: str, include_list: bool = True) -> dict:
         """
         获取课程表证书统计信息
 
         Args:
             syllabus_id: 课程表ID
+            include_list: 是否返回证书列表，为 False 时只做 COUNT 查询
 
         Returns:
             统计信息
         """
+        if not include_list:
+            return {'total_certificates': self._count_certificates_for_syllabus(syllabus_id)}
+
         existing_certs = self._get_existing_certificates_for_syllabus(syllabus_id)
 
         return {
@@ -519,5 +558,5 @@ class CertificateService:
         }
 
 
-# 单例实例
+# 单例实例（模块导入只执行一次，模块级实例即单例）
 certificate_service = CertificateService()
@@ -1,14 +1,35 @@
 """课程管理服务"""
 import os
-import json
+import hashlib
+import threading
+import orjson
 import uuid
 import shutil
 from datetime import datetime
 from io import BytesIO
 from PyPDF2 import PdfReader
+from sqlalchemy import bindparam
 from app.models.base import db
 from app.models.course import Course
 
+# PDF 页数缓存上限，超出时淘汰最早写入的一项
+_PDF_PAGE_CACHE_MAXSIZE = 256
+# 保存上传 PDF 时每次读写的块大小
+_PDF_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def _read_pdf_page_count(reader: PdfReader) -> int:
+    """读取 PDF 页数：优先使用页面树根节点的 /Count（解析 xref 后即可得到），
+    缺失或异常时才回退到 len(reader.pages)（需要展开整个页面树）
+    """
+    try:
+        count = reader.trailer['/Root']['/Pages']['/Count']
+        if isinstance(count, int) and count > 0:
+            return int(count)
+    except Exception:
+        pass
+    return len(reader.pages)
+
 
 class CourseService:
     """课程管理服务"""
@@ -20,6 +41,51 @@ class CourseService:
         # 确保目录存在
         os.makedirs(self.courses_dir, exist_ok=True)
 
+        # PDF 内容摘要 → 页数，重复上传同一文件（重试、重新导入）时不再重新解析
+        self._pdf_page_cache = {}
+        self._pdf_page_cache_lock = threading.Lock()
+
+    def _save_pdf(self, stream, pdf_path: str) -> bytes:
+        """分块把上传的 PDF 写入 pdf_path，边写边计算内容摘要，返回摘要
+
+        先写临时文件再原子替换，写入中途失败时删除临时文件，不会留下半个 content.pdf
+        """
+        hasher = hashlib.blake2b(digest_size=16)
+        tmp_path = pdf_path + '.tmp'
+        try:
+            # 写缓冲与复制块同为 _PDF_COPY_CHUNK_SIZE（1 MiB），大文件写入时系统调用更少
+            with open(tmp_path, 'wb', buffering=_PDF_COPY_CHUNK_SIZE) as f:
+                while chunk := stream.read(_PDF_COPY_CHUNK_SIZE):
+                    hasher.update(chunk)
+                    f.write(chunk)
+            os.replace(tmp_path, pdf_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        return hasher.digest()
+
+    def _count_pdf_pages(self, digest: bytes, pdf_path: str) -> int:
+        """获取已保存 PDF 的页数（按内容摘要缓存，解析失败返回 0）"""
+        with self._pdf_page_cache_lock:
+            total_pages = self._pdf_page_cache.get(digest)
+        if total_pages is not None:
+            return total_pages
+
+        try:
+            with open(pdf_path, 'rb') as f:
+                total_pages = _read_pdf_page_count(PdfReader(f, strict=False))
+        except Exception:
+            return 0
+
+        with self._pdf_page_cache_lock:
+            if len(self._pdf_page_cache) >= _PDF_PAGE_CACHE_MAXSIZE:
+                del self._pdf_page_cache[next(iter(self._pdf_page_cache))]
+            self._pdf_page_cache[digest] = total_pages
+        return total_pages
+
     def _normalize_course(self, course: dict) -> dict:
         """标准化课程数据，确保必要字段存在"""
         # 确保 tags 字段存在
@@ -43,6 +109,14 @@ class CourseService:
             return self._normalize_course(course.to_dict())
         return None
 
+    def get_courses_by_ids(self, course_ids) -> dict:
+        """批量获取课程（一次 IN 查询），返回 {course_id: 课程}，不存在的课程不在结果中"""
+        ids = {cid for cid in course_ids if cid}
+        if not ids:
+            return {}
+        courses = Course.query.filter(Course.id.in_(ids)).all()
+        return {c.id: self._normalize_course(c.to_dict()) for c in courses}
+
     def create_course(self, title: str, description: str, pdf_content: bytes,
                       quiz_survey_id: str = None, pass_score: int = 60,
                       tags: list = None, prerequisites: list = None,
@@ -57,6 +131,29 @@ class CourseService:
             quiz_survey_id: 关联的考卷 ID
             pass_score: 考卷及格分数
 
+        Returns:
+            新创建的课程信息
+        """
+        return self.create_course_from_stream(
+            title, description, BytesIO(pdf_content),
+            quiz_survey_id=quiz_survey_id, pass_score=pass_score,
+            tags=tags, prerequisites=prerequisites, icon=icon
+        )
+
+    def create_course_from_stream(self, title: str, description: str, pdf_stream,
+                                  quiz_survey_id: str = None, pass_score: int = 60,
+                                  tags: list = None, prerequisites: list = None,
+                                  icon: str = None) -> dict:
+        """
+        创建新课程（PDF 以文件流传入，分块写盘，不整体读入内存）
+
+        Args:
+            title: 课程标题
+            description: 课程描述
+            pdf_stream: PDF 文件流（如上传文件的 stream）
+            quiz_survey_id: 关联的考卷 ID
+            pass_score: 考卷及格分数
+
         Returns:
             新创建的课程信息
         """
@@ -67,17 +164,14 @@ class CourseService:
         course_dir = os.path.join(self.courses_dir, course_id)
         os.makedirs(course_dir, exist_ok=True)
 
-        # 保存 PDF 文件
+        # 保存 PDF 文件并获取页数（从已保存的文件读取）；失败时删除新建的课程目录
         pdf_path = os.path.join(course_dir, 'content.pdf')
-        with open(pdf_path, 'wb') as f:
-            f.write(pdf_content)
-
-        # 获取 PDF 页数
         try:
-            reader = PdfReader(BytesIO(pdf_content))
-            total_pages = len(reader.pages)
-        except Exception:
-            total_pages = 0
+            digest = self._save_pdf(pdf_stream, pdf_path)
+            total_pages = self._count_pdf_pages(digest, pdf_path)
+        except BaseException:
+            shutil.rmtree(course_dir, ignore_errors=True)
+            raise
 
         # 估算阅读时长 (每页约 2 分钟)
         duration_minutes = max(5, total_pages * 2)
@@ -97,8 +191,8 @@ class CourseService:
             total_pages=total_pages,
             duration_minutes=duration_minutes,
             order=next_order,
-            tags=json.dumps(tags or [], ensure_ascii=False),
-            prerequisites=json.dumps(prerequisites or [], ensure_ascii=False),
+            tags=orjson.dumps(tags or []).decode(),
+            prerequisites=orjson.dumps(prerequisites or []).decode(),
             is_published=True,
             icon=icon,
             quiz_survey_id=quiz_survey_id,
@@ -143,9 +237,9 @@ class CourseService:
                         course.quiz_survey_id = None
                         course.quiz_pass_score = None
                 elif field == 'tags':
-                    course.tags = json.dumps(updates[field], ensure_ascii=False)
+                    course.tags = orjson.dumps(updates[field]).decode()
                 elif field == 'prerequisites':
-                    course.prerequisites = json.dumps(updates[field], ensure_ascii=False)
+                    course.prerequisites = orjson.dumps(updates[field]).decode()
                 elif field == 'isLocked':
                     # isLocked is not a database field - skip it
                     pass
@@ -192,15 +286,16 @@ class CourseService:
         Returns:
             是否成功
         """
-        # 获取所有课程
-        courses = Course.query.all()
-        course_map = {c.id: c for c in courses}
-
-        # 按新顺序更新
-        for order, course_id in enumerate(course_ids, 1):
-            if course_id in course_map:
-                course_map[course_id].order = order
-
+        if not course_ids:
+            return True
+
+        # 一条 UPDATE 语句批量执行（executemany），不加载课程对象；不存在的课程 ID 不会更新任何行
+        table = Course.__table__
+        stmt = table.update().where(table.c.id == bindparam('b_id')).values(order=bindparam('b_order'))
+        db.session.execute(stmt, [
+            {'b_id': course_id, 'b_order': order}
+            for order, course_id in enumerate(course_ids, 1)
+        ])
         db.session.commit()
         return True
 
@@ -1,8 +1,11 @@
 """Excel 考卷解析服务"""
-import json
 from io import BytesIO
 from openpyxl import load_workbook
 
+# 选项字母，以及答案清洗时需要删除的字符（空格、半角/全角逗号）
+_OPTION_LETTERS = ('A', 'B', 'C', 'D')
+_ANSWER_CLEAN_TABLE = str.maketrans('', '', ' ,，')
+
 
 class ExcelParser:
     """解析 Excel 考卷格式"""
@@ -47,28 +50,26 @@ class ExcelParser:
         """
         errors = []
         questions = []
+        workbook = None
 
         try:
             workbook = load_workbook(filename=BytesIO(file_content), read_only=True)
             sheet = workbook.active
 
-            # 跳过第一行标题
-            rows = list(sheet.iter_rows(min_row=2, values_only=True))
-
-            for row_idx, row in enumerate(rows, start=2):
+            # 跳过第一行标题；直接遍历行生成器，边读取边解析，不先把整张表读入列表
+            parse_row = ExcelParser._parse_row
+            for row_idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
                 # 跳过空行
                 if not row or not row[0]:
                     continue
 
                 try:
-                    question = ExcelParser._parse_row(row, row_idx)
+                    question = parse_row(row, row_idx)
                     if question:
                         questions.append(question)
                 except ValueError as e:
                     errors.append(f"第{row_idx}行: {str(e)}")
 
-            workbook.close()
-
             # 生成摘要（固定每题5分）
             summary = {
                 'total': len(questions),
@@ -91,16 +92,19 @@ class ExcelParser:
                 'errors': [f"解析文件失败: {str(e)}"],
                 'summary': {}
             }
+        finally:
+            # 只读模式的工作簿持有底层 ZIP 句柄，解析失败时也要释放
+            if workbook is not None:
+                workbook.close()
 
     @staticmethod
     def _parse_row(row: tuple, row_idx: int) -> dict:
         """解析单行数据（9列格式）"""
         cols = ExcelParser.COLUMNS
-        option_letters = ['A', 'B', 'C', 'D']
 
         # 获取题型
         raw_type = str(row[cols['type']] or '').strip().lower()
-        question_type = ExcelParser.TYPE_MAP.get(raw_type)
+        question_type = _TYPE_MAP_GET(raw_type)
         if not question_type:
             raise ValueError(f"无效的题型: '{raw_type}'，支持: single, multiple, 单选, 多选")
 
@@ -121,6 +125,9 @@ class ExcelParser:
         if len(options) < 2:
             raise ValueError("至少需要2个选项")
 
+        # 本题有效的答案字母（按实际选项数截取）
+        valid_letters = frozenset(_OPTION_LETTERS[:len(options)])
+
         # 智能检测答案列位置
         # 方法：在选项之后查找第一个看起来像答案的列（A-D 或 A,B,C 格式）
         answer_col_idx = None
@@ -131,8 +138,8 @@ class ExcelParser:
             if row[check_idx]:
                 cell_value = str(row[check_idx]).strip().upper()
                 # 检查是否是有效的答案格式（单个字母或逗号分隔的字母）
-                cleaned = cell_value.replace(' ', '').replace(',', '').replace('，', '')
-                if cleaned and all(c in option_letters[:len(options)] for c in cleaned):
+                cleaned = cell_value.translate(_ANSWER_CLEAN_TABLE)
+                if cleaned and valid_letters.issuperset(cleaned):
                     answer_col_idx = check_idx
                     raw_answer = cell_value
                     break
@@ -142,8 +149,8 @@ class ExcelParser:
             # 尝试9列格式（答案在G列，索引6）
             if len(row) > 6 and row[6]:
                 cell_value = str(row[6]).strip().upper()
-                cleaned = cell_value.replace(' ', '').replace(',', '').replace('，', '')
-                if cleaned and all(c in option_letters[:len(options)] for c in cleaned):
+                cleaned = cell_value.translate(_ANSWER_CLEAN_TABLE)
+                if cleaned and valid_letters.issuperset(cleaned):
                     answer_col_idx = 6
                     raw_answer = cell_value
 
@@ -158,16 +165,15 @@ class ExcelParser:
         # 解析答案
         if question_type == 'multiple_choice':
             # 多选答案：A,B,D 或 ABD
-            answer_parts = raw_answer.replace(' ', '').replace(',', '').replace('，', '')
-            correct_answer = list(answer_parts)
+            correct_answer = list(raw_answer.translate(_ANSWER_CLEAN_TABLE))
             # 验证答案是否在选项范围内
             for ans in correct_answer:
-                if ans not in option_letters[:len(options)]:
+                if ans not in valid_letters:
                     raise ValueError(f"答案 '{ans}' 不在选项范围内")
         else:
             # 单选答案
             correct_answer = raw_answer[0] if raw_answer else ''
-            if correct_answer not in option_letters[:len(options)]:
+            if correct_answer not in valid_letters:
                 raise ValueError(f"答案 '{correct_answer}' 不在选项范围内")
 
         # 获取解析 (可选) - 答案列之后
@@ -233,4 +239,7 @@ class ExcelParser:
         return output.getvalue()
 
 
+# 每行解析都要用到的题型查找，模块加载时绑定一次
+_TYPE_MAP_GET = ExcelParser.TYPE_MAP.get
+
 excel_parser = ExcelParser()
@@ -4,9 +4,12 @@ PMA 系统 API 服务
 支持双数据源：SP8D（人民币市场）和 OVS（美元市场）
 """
 import os
+import time
+import threading
 import requests
 import logging
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Callable
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +30,55 @@ DATASOURCES = {
     }
 }
 
+# 各数据源的 HTTP 请求互不依赖，并发发出（线程在首次提交时才创建）
+_source_pool = ThreadPoolExecutor(max_workers=len(DATASOURCES), thread_name_prefix='pma-source')
+
+# 员工列表短时缓存（秒），避免管理页面重复加载时反复请求外部 API
+EMPLOYEE_CACHE_TTL = int(os.getenv('PMA_EMPLOYEE_CACHE_TTL', 30))
+_EMPLOYEE_CACHE_MAXSIZE = 256
+
+_employee_cache: Dict[tuple, tuple] = {}  # key → (expires_at, employees)
+_employee_cache_lock = threading.Lock()
+
+
+def _get_cached_employees(key: tuple, loader: Callable[[], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """按 key 读取员工列表缓存，未命中或过期时调用 loader 并写入缓存
+
+    空结果不缓存，以便外部 API 恢复后立即生效
+    """
+    now = time.monotonic()
+    with _employee_cache_lock:
+        entry = _employee_cache.get(key)
+    if entry and entry[0] > now:
+        return entry[1]
+
+    employees = loader()
+    if employees:
+        with _employee_cache_lock:
+            if len(_employee_cache) >= _EMPLOYEE_CACHE_MAXSIZE:
+                # 先清理过期项，仍然满则淘汰最早写入的一项
+                for k in [k for k, (expires_at, _) in _employee_cache.items() if expires_at <= now]:
+                    del _employee_cache[k]
+                if len(_employee_cache) >= _EMPLOYEE_CACHE_MAXSIZE:
+                    del _employee_cache[next(iter(_employee_cache))]
+            _employee_cache[key] = (now + EMPLOYEE_CACHE_TTL, employees)
+    return employees
+
+
+def _peek_cached_employees(key: tuple) -> List[Dict[str, Any]] | None:
+    """只读缓存，不触发外部请求；未命中或已过期返回 None"""
+    with _employee_cache_lock:
+        entry = _employee_cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
+def clear_employee_cache():
+    """清空员工列表缓存（员工/用户组数据变更后调用）"""
+    with _employee_cache_lock:
+        _employee_cache.clear()
+
 
 def verify_employee_from_source(username: str, password: str, source: str, remember_me: bool = False) -> Dict[str, Any]:
     """
@@ -233,6 +285,8 @@ def get_all_employees(limit: int = 500, offset: int = 0, search: str = '') -> Li
     """
     获取所有员工 - 合并 SP8D 和 OVS 两个数据源
 
+    结果按 (limit, offset, search) 缓存 EMPLOYEE_CACHE_TTL 秒，调用方不应修改返回的列表
+
     Args:
         limit: 返回数量限制
         offset: 偏移量
@@ -241,14 +295,95 @@ def get_all_employees(limit: int = 500, offset: int = 0, search: str = '') -> Li
     Returns:
         员工列表，格式：[{user_id, name, company, phone, source}]
     """
-    all_employees = []
+    def load():
+        all_employees = []
+
+        # 两个数据源并发请求，总耗时取决于较慢的一个；结果仍按数据源顺序合并
+        for employees in _source_pool.map(
+            lambda source_key: get_employees_from_source(source_key, limit, offset, search),
+            DATASOURCES
+        ):
+            all_employees.extend(employees)
+
+        logger.info(f"从所有数据源共获取到 {len(all_employees)} 名员工")
+        return all_employees
+
+    return _get_cached_employees(('all', limit, offset, search), load)
+
+
+# get_all_employees() 默认参数对应的缓存 key（/users/all 首页加载时写入）
+_FULL_EMPLOYEE_LIST_KEY = ('all', 500, 0, '')
 
-    for source_key in DATASOURCES:
-        employees = get_employees_from_source(source_key, limit, offset, search)
-        all_employees.extend(employees)
+# 本地搜索匹配的员工字段
+_EMPLOYEE_SEARCH_FIELDS = ('name', 'real_name', 'username')
 
-    logger.info(f"从所有数据源共获取到 {len(all_employees)} 名员工")
-    return all_employees
+
+# 员工搜索的 2-gram 倒排索引：(对应的员工列表, 每人小写字段, bigram → 员工下标列表, 是否被截断)
+_search_index = None
+_search_index_lock = threading.Lock()
+
+
+def _get_search_index(employees: List[Dict[str, Any]]) -> tuple:
+    """获取 employees 对应的 2-gram 索引；缓存列表被替换后重建
+
+    下标按员工顺序追加，候选结果保持原列表顺序
+    任一数据源返回满一页（limit 条）时视为截断：该源还有未缓存的员工
+    """
+    global _search_index
+    with _search_index_lock:
+        if _search_index is not None and _search_index[0] is employees:
+            return _search_index
+
+        texts = []
+        bigrams: Dict[str, List[int]] = {}
+        source_counts: Dict[str, int] = {}
+        for i, emp in enumerate(employees):
+            source = emp.get('source')
+            source_counts[source] = source_counts.get(source, 0) + 1
+            fields = tuple(str(emp.get(f) or '').lower() for f in _EMPLOYEE_SEARCH_FIELDS)
+            texts.append(fields)
+            grams = set()
+            for text in fields:
+                grams.update(text[j:j + 2] for j in range(len(text) - 1))
+            for gram in grams:
+                bigrams.setdefault(gram, []).append(i)
+
+        truncated = any(count >= _FULL_EMPLOYEE_LIST_KEY[1] for count in source_counts.values())
+        _search_index = (employees, texts, bigrams, truncated)
+        return _search_index
+
+
+def search_cached_employees(query: str, limit: int = 20) -> List[Dict[str, Any]] | None:
+    """在已缓存的全量员工列表中做本地子串匹配
+
+    查询长度 ≥ 2 时先用最稀有的 bigram 取候选，再逐个确认子串匹配（Volnitsky 式预过滤）
+    以下情况返回 None，由调用方回退到外部 API 搜索：
+    - 缓存未预热
+    - 缓存的列表被截断（只含各数据源的第一页），本地结果可能不完整
+    - 本地没有匹配（外部 API 可能按本地未索引的字段匹配）
+    """
+    employees = _peek_cached_employees(_FULL_EMPLOYEE_LIST_KEY)
+    if employees is None:
+        return None
+
+    _, texts, bigrams, truncated = _get_search_index(employees)
+    if truncated:
+        return None
+    q = query.lower()
+
+    if len(q) >= 2:
+        postings = [bigrams.get(q[j:j + 2], ()) for j in range(len(q) - 1)]
+        candidates = min(postings, key=len)
+    else:
+        candidates = range(len(employees))
+
+    matched = []
+    for i in candidates:
+        if any(q in text for text in texts[i]):
+            matched.append(employees[i])
+            if len(matched) >= limit:
+                break
+    return matched or None
 
 
 def get_raw_employees_from_source(source: str, limit: int = 500) -> List[Dict[str, Any]]:
@@ -288,10 +423,13 @@ def get_raw_employees(limit: int = 500) -> List[Dict[str, Any]]:
 
     用于迁移：构建 emp_{user_id} → emp_{id} 的映射。
     """
-    all_employees = []
-    for source_key in DATASOURCES:
-        all_employees.extend(get_raw_employees_from_source(source_key, limit))
-    return all_employees
+    def load():
+        all_employees = []
+        for source_key in DATASOURCES:
+            all_employees.extend(get_raw_employees_from_source(source_key, limit))
+        return all_employees
+
+    return _get_cached_employees(('raw', limit), load)
 
 
 def get_employee_by_id(employee_id: str) -> Dict[str, Any] | None:
@@ -316,3 +454,35 @@ def get_employee_by_id(employee_id: str) -> Dict[str, Any] | None:
 
     logger.warning(f"未找到员工 ID: {employee_id}")
     return None
+
+
+def get_employees_by_ids(user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    批量获取员工信息（一次遍历员工列表）
+
+    与 get_employee_by_id 一致：emp_{id} 没有精确匹配时，按 emp_ovs_{id} 匹配
+    （旧数据中 OVS 员工可能没有 ovs 前缀）
+
+    Args:
+        user_ids: 员工用户ID列表（含 emp_ / emp_ovs_ 前缀）
+
+    Returns:
+        {user_id: 员工信息字典}，键为传入的ID，未找到的ID不包含在结果中
+    """
+    wanted = set(user_ids)
+    if not wanted:
+        return {}
+
+    aliases = {'emp_ovs_' + uid[4:]: uid for uid in wanted if uid.startswith('emp_')}
+    found = {}
+    alias_found = {}
+    for emp in get_all_employees():
+        user_id = emp.get('user_id')
+        if user_id in wanted:
+            found[user_id] = emp
+        if user_id in aliases:
+            alias_found.setdefault(aliases[user_id], emp)
+
+    for user_id, emp in alias_found.items():
+        found.setdefault(user_id, emp)
+    return found
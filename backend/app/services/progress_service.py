@@ -3,6 +3,7 @@
 替代原 Google Sheets 数据层，保持所有方法签名和返回格式不变
 """
 from datetime import datetime
+from types import MappingProxyType
 import uuid
 import json
 
@@ -10,6 +11,36 @@ from app.models.base import db
 from app.models.user_progress import UserProgress
 
 
+# 默认进度模板（只读，模块导入时构建一次）
+_DEFAULT_PROGRESS = MappingProxyType({
+    'streak': 0,
+    'lastReadDate': None,
+    'totalXP': 0,
+    'hearts': 5,
+    'maxHearts': 5,
+    'dailyGoalMinutes': 10,
+    'currentChapter': 1,
+    'currentSection': 0,
+    'chaptersCompleted': [],
+    'achievements': [],
+    'wordsLearned': [],
+    'totalReadingTime': 0,
+    'onboardingCompleted': False,
+    'coursesCompleted': [],
+    'quizzesPassed': 0,
+    'quizStreak': 0,
+    'lastLoginRewardDate': None,
+    'firstPassedQuizzes': [],
+    'wrongQuestions': [],
+    'xpBySyllabus': {},
+    'firstLoginRewardClaimed': False,
+})
+# 模板中的可变字段，每次复制时需要新建
+_DEFAULT_PROGRESS_CONTAINER_KEYS = tuple(
+    k for k, v in _DEFAULT_PROGRESS.items() if isinstance(v, (list, dict))
+)
+
+
 class ProgressService:
     """用户进度服务 - 使用 SQLAlchemy 替代 Google Sheets"""
 
@@ -98,29 +129,11 @@ class ProgressService:
             return False
 
     def get_default_progress(self) -> dict:
-        return {
-            'streak': 0,
-            'lastReadDate': None,
-            'totalXP': 0,
-            'hearts': 5,
-            'maxHearts': 5,
-            'dailyGoalMinutes': 10,
-            'currentChapter': 1,
-            'currentSection': 0,
-            'chaptersCompleted': [],
-            'achievements': [],
-            'wordsLearned': [],
-            'totalReadingTime': 0,
-            'onboardingCompleted': False,
-            'coursesCompleted': [],
-            'quizzesPassed': 0,
-            'quizStreak': 0,
-            'lastLoginRewardDate': None,
-            'firstPassedQuizzes': [],
-            'wrongQuestions': [],
-            'xpBySyllabus': {},
-            'firstLoginRewardClaimed': False,
-        }
+        """返回默认进度的独立副本（列表/字典字段为新对象，调用方可直接修改）"""
+        progress = dict(_DEFAULT_PROGRESS)
+        for key in _DEFAULT_PROGRESS_CONTAINER_KEYS:
+            progress[key] = progress[key].copy()
+        return progress
 
     def add_syllabus_xp(self, user_id: str, syllabus_id: str, xp: int) -> bool:
         try:
@@ -141,6 +154,19 @@ class ProgressService:
         all_progress = UserProgress.query.all()
         return [p.to_dict_with_user_id() for p in all_progress]
 
+    def get_progress_for_syllabus(self, syllabus_id: str) -> list:
+        """获取在指定课程表中有 XP 记录的用户进度
+
+        xp_by_syllabus 是 JSON 文本列，先在数据库中按键名做 LIKE 预过滤，
+        不再把所有用户的进度都读出来；行按批次流式读取，XP 是否大于 0 仍由调用方判断
+        """
+        query = UserProgress.query.filter(
+            UserProgress.xp_by_syllabus.contains(
+                json.dumps(syllabus_id, ensure_ascii=False), autoescape=True
+            )
+        ).yield_per(500)
+        return [p.to_dict_with_user_id() for p in query]
+
     def _get_user_map(self) -> dict:
         """获取用户ID到用户名的映射"""
         from app.services.sheets_service import sheets_service
@@ -244,7 +270,7 @@ class ProgressService:
         }
 
     def _get_syllabus_leaderboard(self, syllabus_id: str, user_id: str, limit: int) -> dict:
-        all_progress = self._get_all_user_progress()
+        all_progress = self.get_progress_for_syllabus(syllabus_id)
         syllabus_progress = []
         for p in all_progress:
             xp_by_syllabus = p.get('xpBySyllabus', {})
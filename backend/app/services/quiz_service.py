@@ -28,7 +28,7 @@ class QuizService:
     @staticmethod
     def check_attempt_limit(user_id, survey_id):
         survey = sheets_service.get_survey_by_id(survey_id)
-        max_attempts = int(survey.get('max_attempts', 3))
+        max_attempts = survey['max_attempts']
         current = sheets_service.get_user_attempts(user_id, survey_id)
         return (True, max_attempts - current) if current < max_attempts else (False, 0)
     
@@ -61,6 +61,13 @@ class SheetsService:
         user = db.session.get(User, user_id)
         return user.to_dict() if user else None
 
+    def get_users_by_ids(self, user_ids):
+        """批量获取用户，返回 {user_id: user_dict}（单次 IN 查询）"""
+        if not user_ids:
+            return {}
+        users = User.query.filter(User.user_id.in_(list(user_ids))).all()
+        return {u.user_id: u.to_dict() for u in users}
+
     def search_users(self, query, limit=20):
         query_lower = f'%{query.lower()}%'
         users = User.query.filter(
@@ -199,6 +206,18 @@ class SheetsService:
         questions = Question.query.filter_by(survey_id=survey_id).order_by(Question.order_index).all()
         return [q.to_dict() for q in questions]
 
+    def get_questions_by_surveys(self, survey_ids):
+        """批量获取多个问卷的题目，返回 {survey_id: [question_dict, ...]}（单次 IN 查询）"""
+        result = {sid: [] for sid in survey_ids}
+        if not result:
+            return result
+        questions = Question.query.filter(
+            Question.survey_id.in_(list(result))
+        ).order_by(Question.survey_id, Question.order_index).all()
+        for q in questions:
+            result[q.survey_id].append(q.to_dict())
+        return result
+
     def get_question_by_id(self, question_id, survey_id=None):
         if survey_id:
             q = Question.query.filter_by(question_id=question_id, survey_id=survey_id).first()
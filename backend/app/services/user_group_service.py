@@ -118,6 +118,49 @@ class UserGroupService:
         member_ids.update(user_ids)
         return self._update_member_ids(group_id, list(member_ids))
 
+    def save_user_groups_batch(self, rows: List[list]) -> int:
+        """批量写入用户组（迁移用）
+
+        rows 每行格式与 UserGroups 表列一致：
+        [group_id, name, description, member_ids_json, created_at, updated_at]
+        已存在的 group_id 覆盖更新；一次查询 + 一次提交，替代逐行写入
+        """
+        if not rows:
+            return 0
+
+        group_ids = [row[0] for row in rows]
+        existing = {
+            g.group_id: g
+            for g in UserGroup.query.filter(UserGroup.group_id.in_(group_ids)).all()
+        }
+
+        now = datetime.now()
+        for group_id, name, description, member_ids_json, created_at, updated_at in rows:
+            group = existing.get(group_id)
+            if group is None:
+                group = UserGroup(group_id=group_id)
+                db.session.add(group)
+                existing[group_id] = group
+            group.name = name
+            group.description = description
+            group.member_ids = member_ids_json
+            group.created_at = self._parse_datetime(created_at) or now
+            group.updated_at = self._parse_datetime(updated_at) or now
+
+        db.session.commit()
+        return len(rows)
+
+    @staticmethod
+    def _parse_datetime(val) -> Optional[datetime]:
+        if not val:
+            return None
+        if isinstance(val, datetime):
+            return val
+        try:
+            return datetime.fromisoformat(str(val))
+        except (ValueError, TypeError):
+            return None
+
     def get_user_groups_for_user(self, user_id: str) -> List[dict]:
         """获取用户所属的所有用户组"""
         groups = self.get_all_user_groups()
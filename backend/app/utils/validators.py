@@ -1,11 +1,14 @@
 import re
 from datetime import datetime
 
+# 模块加载时预编译
+_PHONE_RE = re.compile(r'^1[3-9]\d{9}$')  # 中国手机号格式
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_VALID_QUESTION_TYPES = frozenset(('single_choice', 'multiple_choice', 'fill_blank'))
+
 def validate_phone(phone):
     """验证手机号"""
-    # 中国手机号格式
-    pattern = r'^1[3-9]\d{9}$'
-    return re.match(pattern, phone) is not None
+    return _PHONE_RE.match(phone) is not None
 
 def validate_name(name):
     """验证姓名"""
@@ -21,8 +24,7 @@ def validate_company(company):
 
 def validate_email(email):
     """验证邮箱"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return _EMAIL_RE.match(email) is not None
 
 def validate_datetime(date_string):
     """验证日期时间格式"""
@@ -34,5 +36,4 @@ def validate_datetime(date_string):
 
 def validate_question_type(question_type):
     """验证题目类型"""
-    valid_types = ['single_choice', 'multiple_choice', 'fill_blank']
-    return question_type in valid_types
+    return isinstance(question_type, str) and question_type in _VALID_QUESTION_TYPES
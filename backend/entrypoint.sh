@@ -40,6 +40,10 @@ fi
 echo "✅ Database ready"
 
 # Start gunicorn
+# gthread workers: each worker serves several requests concurrently, so calls
+# blocked on PMA/DB I/O no longer tie up the whole worker
 PORT=${PORT:-5007}
-echo "🌐 Starting gunicorn on port $PORT..."
-exec gunicorn --bind "0.0.0.0:$PORT" --workers 2 --timeout 120 run:app
+GUNICORN_THREADS=${GUNICORN_THREADS:-8}
+echo "🌐 Starting gunicorn on port $PORT ($GUNICORN_THREADS threads/worker)..."
+exec gunicorn --bind "0.0.0.0:$PORT" --workers 2 --worker-class gthread \
+    --threads "$GUNICORN_THREADS" --timeout 120 run:app
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+为已有数据库的 course_badges 表补建 (user_id, course_id) 唯一约束
+
+徽章发放使用 INSERT ... ON CONFLICT (user_id, course_id) DO UPDATE，
+PostgreSQL 要求冲突目标上存在唯一约束，否则每次发放/更新徽章都会报错：
+  no unique or exclusion constraint matching the ON CONFLICT specification
+
+新建的数据库由 db.create_all() 直接建出约束；已有数据库需要运行本脚本一次：
+  cd backend
+  python scripts/add_badge_unique_constraint.py
+
+步骤（同一事务内完成，期间锁表阻止并发写入）：
+  1. 合并重复的 (user_id, course_id)：保留得分最高的一条（同分保留最早获得的），
+     其 first_passed_at 取组内最早时间，attempt_count 取组内总和，删除其余行
+  2. ALTER TABLE course_badges ADD CONSTRAINT uq_badge_user_course UNIQUE (user_id, course_id)
+
+约束已存在时直接退出，可重复运行
+"""
+import sys
+import os
+
+# 路径修正 - 支持从 backend/ 或 backend/scripts/ 运行
+script_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(script_dir)
+sys.path.insert(0, backend_dir)
+
+from dotenv import load_dotenv
+load_dotenv(os.path.join(backend_dir, '.env'))
+
+from sqlalchemy import text
+
+CONSTRAINT_NAME = 'uq_badge_user_course'
+
+# 每组重复记录按 得分降序、获得时间升序 排名，第 1 名保留
+_COLLECT_DUPLICATES = text("""
+    CREATE TEMP TABLE badge_duplicates ON COMMIT DROP AS
+    SELECT badge_id, rn, first_at, attempts
+    FROM (
+        SELECT badge_id,
+               ROW_NUMBER() OVER (
+                   PARTITION BY user_id, course_id
+                   ORDER BY score DESC NULLS LAST, first_passed_at ASC NULLS LAST, badge_id
+               ) AS rn,
+               MIN(first_passed_at) OVER w AS first_at,
+               SUM(COALESCE(attempt_count, 1)) OVER w AS attempts,
+               COUNT(*) OVER w AS group_size
+        FROM course_badges
+        WINDOW w AS (PARTITION BY user_id, course_id)
+    ) ranked
+    WHERE group_size > 1
+""")
+
+_MERGE_KEPT = text("""
+    UPDATE course_badges b
+    SET first_passed_at = d.first_at, attempt_count = d.attempts
+    FROM badge_duplicates d
+    WHERE b.badge_id = d.badge_id AND d.rn = 1
+""")
+
+_DELETE_REST = text("""
+    DELETE FROM course_badges b
+    USING badge_duplicates d
+    WHERE b.badge_id = d.badge_id AND d.rn > 1
+""")
+
+_ADD_CONSTRAINT = text(
+    f"ALTER TABLE course_badges ADD CONSTRAINT {CONSTRAINT_NAME} UNIQUE (user_id, course_id)"
+)
+
+
+def add_badge_unique_constraint(db) -> None:
+    """合并重复徽章并添加唯一约束（约束已存在时跳过）"""
+    exists = db.session.execute(
+        text("SELECT 1 FROM pg_constraint WHERE conname = :name"),
+        {'name': CONSTRAINT_NAME}
+    ).scalar()
+    if exists:
+        print(f"✅ 约束 {CONSTRAINT_NAME} 已存在，无需处理")
+        return
+
+    try:
+        # 阻止迁移期间有新的重复行写入（读取不受影响）
+        db.session.execute(text("LOCK TABLE course_badges IN SHARE ROW EXCLUSIVE MODE"))
+        db.session.execute(_COLLECT_DUPLICATES)
+        merged = db.session.execute(_MERGE_KEPT).rowcount
+        deleted = db.session.execute(_DELETE_REST).rowcount
+        db.session.execute(_ADD_CONSTRAINT)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    print(f"🔁 合并了 {merged} 组重复徽章，删除 {deleted} 条多余记录")
+    print(f"✅ 已添加约束 {CONSTRAINT_NAME}")
+
+
+if __name__ == '__main__':
+    from app import create_app
+    from app.models.base import db
+
+    app = create_app()
+    with app.app_context():
+        add_badge_unique_constraint(db)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+为已有数据库的 course_badges 表补建 (user_id, first_passed_at DESC) 复合索引
+
+get_user_badges() 按 user_id 过滤、按 first_passed_at 倒序排列，复合索引可直接按序读取。
+它与唯一约束 uq_badge_user_course 都以 user_id 开头，因此删除旧的单列索引
+ix_course_badges_user_id；唯一约束已存在时，旧的 idx_badge_user_course 也一并删除。
+
+新建的数据库由 db.create_all() 直接建出索引；已有数据库需要运行本脚本一次
+（建议先运行 add_badge_unique_constraint.py）：
+  cd backend
+  python scripts/add_badge_user_first_passed_index.py
+
+等价 SQL（CONCURRENTLY 不阻塞读写，不能在事务中执行）：
+  CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_badge_user_first_passed
+      ON course_badges (user_id, first_passed_at DESC);
+  DROP INDEX CONCURRENTLY IF EXISTS ix_course_badges_user_id;
+  -- 仅当 uq_badge_user_course 已存在时
+  DROP INDEX CONCURRENTLY IF EXISTS idx_badge_user_course;
+
+上次中断留下的无效索引会先删除再重建；可重复运行
+"""
+import sys
+import os
+
+# 路径修正 - 支持从 backend/ 或 backend/scripts/ 运行
+script_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(script_dir)
+sys.path.insert(0, backend_dir)
+
+from dotenv import load_dotenv
+load_dotenv(os.path.join(backend_dir, '.env'))
+
+from sqlalchemy import text
+
+INDEX_NAME = 'ix_badge_user_first_passed'
+OLD_USER_INDEX_NAME = 'ix_course_badges_user_id'
+OLD_USER_COURSE_INDEX_NAME = 'idx_badge_user_course'
+UNIQUE_CONSTRAINT_NAME = 'uq_badge_user_course'
+
+_INDEX_VALID = text("""
+    SELECT i.indisvalid
+    FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE c.relname = :name
+""")
+
+
+def add_badge_user_first_passed_index(db) -> None:
+    """创建 (user_id, first_passed_at DESC) 索引并删除被取代的旧索引"""
+    # CONCURRENTLY 需要在事务外执行
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        valid = conn.execute(_INDEX_VALID, {'name': INDEX_NAME}).scalar()
+        if valid is False:
+            print(f"⚠️ 索引 {INDEX_NAME} 无效（上次创建被中断），删除后重建")
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}"))
+
+        conn.execute(text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} "
+            "ON course_badges (user_id, first_passed_at DESC)"
+        ))
+        print(f"✅ 索引 {INDEX_NAME} 已就绪")
+
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {OLD_USER_INDEX_NAME}"))
+        print(f"✅ 已删除旧索引 {OLD_USER_INDEX_NAME}（如存在）")
+
+        # 用户+课程查询由唯一约束的索引承担；约束未建好前保留旧索引
+        has_unique = conn.execute(
+            text("SELECT 1 FROM pg_constraint WHERE conname = :name"),
+            {'name': UNIQUE_CONSTRAINT_NAME}
+        ).scalar()
+        if has_unique:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {OLD_USER_COURSE_INDEX_NAME}"))
+            print(f"✅ 已删除旧索引 {OLD_USER_COURSE_INDEX_NAME}（如存在）")
+        else:
+            print(f"⏭️ 约束 {UNIQUE_CONSTRAINT_NAME} 不存在，保留 {OLD_USER_COURSE_INDEX_NAME}"
+                  "（请先运行 add_badge_unique_constraint.py）")
+
+
+if __name__ == '__main__':
+    from app import create_app
+    from app.models.base import db
+
+    app = create_app()
+    with app.app_context():
+        add_badge_user_first_passed_index(db)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+为已有数据库的 certificates 表补建 (user_id, issued_at DESC) 复合索引
+
+get_user_certificates() 按 user_id 过滤、按 issued_at 倒序分页，复合索引可直接按序读取，
+无需排序；它同时覆盖只按 user_id 的查询，因此删除原来的单列索引 ix_certificates_user_id。
+
+新建的数据库由 db.create_all() 直接建出索引；已有数据库需要运行本脚本一次：
+  cd backend
+  python scripts/add_certificate_user_issued_index.py
+
+等价 SQL（CONCURRENTLY 不阻塞读写，不能在事务中执行）：
+  CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_certificate_user_issued
+      ON certificates (user_id, issued_at DESC);
+  DROP INDEX CONCURRENTLY IF EXISTS ix_certificates_user_id;
+
+上次中断留下的无效索引会先删除再重建；可重复运行
+"""
+import sys
+import os
+
+# 路径修正 - 支持从 backend/ 或 backend/scripts/ 运行
+script_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(script_dir)
+sys.path.insert(0, backend_dir)
+
+from dotenv import load_dotenv
+load_dotenv(os.path.join(backend_dir, '.env'))
+
+from sqlalchemy import text
+
+INDEX_NAME = 'ix_certificate_user_issued'
+OLD_INDEX_NAME = 'ix_certificates_user_id'
+
+_INDEX_VALID = text("""
+    SELECT i.indisvalid
+    FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE c.relname = :name
+""")
+
+
+def add_certificate_user_issued_index(db) -> None:
+    """创建 (user_id, issued_at DESC) 索引并删除旧的 user_id 单列索引"""
+    # CONCURRENTLY 需要在事务外执行
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        valid = conn.execute(_INDEX_VALID, {'name': INDEX_NAME}).scalar()
+        if valid is False:
+            print(f"⚠️ 索引 {INDEX_NAME} 无效（上次创建被中断），删除后重建")
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}"))
+
+        conn.execute(text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} "
+            "ON certificates (user_id, issued_at DESC)"
+        ))
+        print(f"✅ 索引 {INDEX_NAME} 已就绪")
+
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {OLD_INDEX_NAME}"))
+        print(f"✅ 已删除旧索引 {OLD_INDEX_NAME}（如存在）")
+
+
+if __name__ == '__main__':
+    from app import create_app
+    from app.models.base import db
+
+    app = create_app()
+    with app.app_context():
+        add_certificate_user_issued_index(db)
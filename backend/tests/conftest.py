@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+# 测试使用内存 SQLite，需在导入 app 之前设置（load_dotenv 不覆盖已有变量）
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['API_KEY'] = 'test-api-key'
+os.environ['JWT_SECRET_KEY'] = 'test-jwt-secret-key-at-least-32-bytes'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from app.models import db  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
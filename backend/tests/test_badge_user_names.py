@@ -0,0 +1,43 @@
+import pytest
+
+from app.models import db
+from app.models.course_badge import CourseBadge
+from app.services import pma_api_service
+from app.services.badge_service import badge_service
+
+
+@pytest.fixture(autouse=True)
+def employees(monkeypatch):
+    # emp_7 是旧数据中没有 ovs 前缀的 OVS 员工
+    employees = [
+        {'user_id': 'emp_1', 'name': '张三', 'source': 'sp8d'},
+        {'user_id': 'emp_ovs_7', 'name': 'Alice', 'source': 'ovs'},
+    ]
+    monkeypatch.setattr(pma_api_service, 'get_all_employees', lambda *a, **k: employees)
+    badge_service.invalidate_user_name()
+    yield employees
+    badge_service.invalidate_user_name()
+
+
+def test_batch_lookup_matches_single_lookup_for_legacy_ovs_ids(app):
+    names = badge_service._get_user_names({'emp_1', 'emp_7', 'emp_ovs_7', 'emp_9'})
+
+    assert names == {'emp_1': '张三', 'emp_7': 'Alice', 'emp_ovs_7': 'Alice', 'emp_9': '未知用户'}
+    for user_id, name in names.items():
+        badge_service.invalidate_user_name(user_id)
+        assert badge_service._get_user_name(user_id) == name
+
+
+def test_refresh_user_names_resolves_legacy_ovs_ids(app):
+    db.session.add(CourseBadge(badge_id='badge-1', user_id='emp_7', user_name='未知用户',
+                               course_id='c1', course_title='课程1'))
+    db.session.commit()
+
+    assert badge_service.refresh_user_names(['emp_7']) == 1
+    assert db.session.get(CourseBadge, 'badge-1').user_name == 'Alice'
+
+
+def test_exact_id_wins_over_ovs_alias(employees):
+    employees.append({'user_id': 'emp_7', 'name': 'Bob', 'source': 'sp8d'})
+
+    assert pma_api_service.get_employees_by_ids(['emp_7'])['emp_7']['name'] == 'Bob'
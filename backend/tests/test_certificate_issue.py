@@ -0,0 +1,36 @@
+import pytest
+
+from app.services import pma_api_service
+from app.services.certificate_service import certificate_service
+from app.services.course_service import course_service
+from app.services.progress_service import progress_service
+from app.services.sheets_service import sheets_service
+from app.services.syllabus_service import syllabus_service
+
+
+@pytest.fixture
+def scores(app, monkeypatch):
+    """单门课程、单个测验的课程表；返回可修改的分数列表"""
+    course = {'id': 'c1', 'title': '课程1', 'quiz': {'survey_id': 's1', 'pass_score': 60}}
+    syllabus = {'id': 'syl1', 'name': '课程表', 'course_sequence': [{'course_id': 'c1'}]}
+    progress = [{'user_id': 'emp_1', 'xpBySyllabus': {'syl1': 100}, 'firstPassedQuizzes': ['s1']}]
+    scores = [{'user_id': 'emp_1', 'survey_id': 's1', 'total_score': 20, 'max_score': 30}]
+
+    monkeypatch.setattr(syllabus_service, 'get_syllabus', lambda sid: syllabus)
+    monkeypatch.setattr(course_service, 'get_courses_by_ids', lambda ids: {'c1': course})
+    monkeypatch.setattr(progress_service, 'get_progress_for_syllabus', lambda sid: progress)
+    monkeypatch.setattr(sheets_service, 'get_all_scores', lambda: list(scores))
+    monkeypatch.setattr(sheets_service, 'get_questions_by_surveys', lambda ids: {'s1': [1, 2, 3]})
+    monkeypatch.setattr(pma_api_service, 'get_all_employees', lambda *a, **k: [])
+    return scores
+
+
+def test_reissue_uses_current_scores(scores):
+    first = certificate_service.issue_certificates_for_syllabus('syl1')
+    assert first['certificates'][0]['score'] == 20
+
+    scores.append({'user_id': 'emp_1', 'survey_id': 's1', 'total_score': 25, 'max_score': 30})
+    second = certificate_service.issue_certificates_for_syllabus('syl1')
+
+    assert second['success'] is True
+    assert (second['certificates'][0]['score'], second['certificates'][0]['max_score']) == (25, 30)
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app.models import db
+from app.models.certificate import Certificate
+
+
+@pytest.fixture
+def auth_headers(app):
+    return {'Authorization': f'Bearer {create_access_token(identity="emp_1")}'}
+
+
+@pytest.fixture
+def certificates(app):
+    base = datetime(2026, 1, 1)
+    # cert-0 最早颁发，cert-4 最新；另有一张其他用户的证书
+    for i in range(5):
+        db.session.add(Certificate(certificate_id=f'cert-{i}', user_id='emp_1',
+                                   syllabus_id=f'syl-{i}', issued_at=base + timedelta(days=i)))
+    db.session.add(Certificate(certificate_id='cert-other', user_id='emp_2',
+                               syllabus_id='syl-0', issued_at=base))
+    db.session.commit()
+
+
+def _ids(response):
+    return [c['certificate_id'] for c in response.get_json()['data']]
+
+
+def test_returns_all_certificates_newest_first(client, auth_headers, certificates):
+    response = client.get('/api/certificates', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert _ids(response) == ['cert-4', 'cert-3', 'cert-2', 'cert-1', 'cert-0']
+
+
+def test_limit_and_offset(client, auth_headers, certificates):
+    response = client.get('/api/certificates?limit=2&offset=1', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert _ids(response) == ['cert-3', 'cert-2']
+
+
+def test_offset_past_end_returns_empty(client, auth_headers, certificates):
+    response = client.get('/api/certificates?offset=10', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert _ids(response) == []
+
+
+@pytest.mark.parametrize('query', ['limit=-1', 'offset=-1', 'limit=2&offset=-5'])
+def test_negative_paging_params_rejected(client, auth_headers, certificates, query):
+    response = client.get(f'/api/certificates?{query}', headers=auth_headers)
+
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
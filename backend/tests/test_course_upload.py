@@ -0,0 +1,37 @@
+import io
+import os
+
+import pytest
+
+from app.services.course_service import course_service
+
+
+class _FailingStream(io.BytesIO):
+    """读出第一块后模拟上传中断"""
+
+    def read(self, size=-1):
+        if self.tell():
+            raise OSError('connection reset')
+        return super().read(size)
+
+
+@pytest.fixture
+def courses_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(course_service, 'courses_dir', str(tmp_path))
+    return tmp_path
+
+
+def test_save_pdf_removes_temp_file_on_failure(courses_dir):
+    pdf_path = os.path.join(courses_dir, 'content.pdf')
+
+    with pytest.raises(OSError):
+        course_service._save_pdf(_FailingStream(b'%PDF' * 1024 * 1024), pdf_path)
+
+    assert os.listdir(courses_dir) == []
+
+
+def test_failed_upload_leaves_no_course_directory(app, courses_dir):
+    with pytest.raises(OSError):
+        course_service.create_course_from_stream('课程', '', _FailingStream(b'%PDF' * 1024 * 1024))
+
+    assert os.listdir(courses_dir) == []
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from app.routes import user_group
+from app.services import pma_api_service
+
+
+def _employee(source, i):
+    return {'user_id': f'emp_{source}_{i}', 'name': f'{source} 员工 {i:04d}',
+            'username': f'{source}_user_{i:04d}', 'source': source}
+
+
+def _seed_full_list(employees):
+    """把 employees 写入 get_all_employees() 默认参数对应的缓存"""
+    pma_api_service.clear_employee_cache()
+    pma_api_service._employee_cache[pma_api_service._FULL_EMPLOYEE_LIST_KEY] = (
+        time.monotonic() + 60, employees
+    )
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    yield
+    pma_api_service.clear_employee_cache()
+
+
+def test_local_hit_on_complete_list():
+    _seed_full_list([_employee('sp8d', i) for i in range(30)])
+
+    result = pma_api_service.search_cached_employees('user_0012')
+
+    assert [e['user_id'] for e in result] == ['emp_sp8d_12']
+
+
+def test_no_local_match_is_a_miss():
+    _seed_full_list([_employee('sp8d', i) for i in range(30)])
+
+    assert pma_api_service.search_cached_employees('张三') is None
+
+
+def test_truncated_list_is_a_miss():
+    # 超过 500 名员工：sp8d 只缓存到第一页（500 条），第 500 名之后的员工不在缓存中
+    _seed_full_list([_employee('sp8d', i) for i in range(500)] +
+                    [_employee('ovs', i) for i in range(120)])
+
+    # 即使本地有匹配也可能不完整，必须回退到外部 API
+    assert pma_api_service.search_cached_employees('sp8d_user_0001') is None
+    assert pma_api_service.search_cached_employees('sp8d_user_0700') is None
+
+
+def test_search_route_falls_back_to_remote_search(client, monkeypatch):
+    _seed_full_list([_employee('sp8d', i) for i in range(500)] +
+                    [_employee('ovs', i) for i in range(120)])
+    remote_hit = _employee('sp8d', 700)
+    calls = []
+
+    def fake_get_all_employees(limit=500, offset=0, search=''):
+        calls.append((limit, search))
+        return [remote_hit]
+
+    monkeypatch.setattr(user_group, 'get_all_employees', fake_get_all_employees)
+
+    response = client.get('/api/admin/users/search?q=sp8d_user_0700',
+                          headers={'X-API-Key': 'test-api-key'})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['source'] == 'pma'
+    assert body['data'] == [remote_hit]
+    assert calls == [(20, 'sp8d_user_0700')]